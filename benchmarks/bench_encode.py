@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: capture buffer -> image bytes for the vision model.
+
+Compares the old path (Image.frombytes("RGB", ...) + PIL PNG into a BytesIO)
+with the zero-copy NumPy view + FrameEncoder for each encoder format.
+Runs on synthetic frames, so no display or Ollama is needed.
+
+Usage:
+    python benchmarks/bench_encode.py [--width 116] [--height 40] [--frames 500]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from mss.screenshot import ScreenShot
+from PIL import Image
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import scan_deposits  # noqa: E402
+
+
+def make_shot(width, height):
+    """A fresh mss ScreenShot with some digits drawn on it, like a real grab."""
+    bgra = np.zeros((height, width, 4), np.uint8)
+    bgra[..., 3] = 255
+    cv2.putText(bgra, "18.000", (4, int(height * 0.75)), cv2.FONT_HERSHEY_SIMPLEX,
+                height / 50, (255, 230, 230, 255), 2, cv2.LINE_AA)
+    monitor = {"left": 0, "top": 0, "width": width, "height": height}
+    return ScreenShot(bytearray(bgra.tobytes()), monitor)
+
+
+def old_path(shot):
+    pil_img = Image.frombytes("RGB", shot.size, shot.rgb)
+    buf = io.BytesIO()
+    pil_img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def new_path(encoder):
+    def run(shot):
+        return encoder.encode(scan_deposits.frame_view(shot))
+    return run
+
+
+def measure(name, fn, shots):
+    # Warm-up (also fills the encoder's reusable buffers)
+    fn(shots[0])
+    cpu0 = time.process_time()
+    for shot in shots:
+        size = len(fn(shot))
+    cpu_us = (time.process_time() - cpu0) / len(shots) * 1e6
+
+    # Transient allocations of one frame, measured separately so tracing doesn't skew timing.
+    # CPython cannot count freed blocks cheaply, so report the traced high-water mark
+    # (NumPy and OpenCV output arrays are traced too) relative to the raw BGRA frame size.
+    shot = make_shot(shot.width, shot.height)  # mss caches .rgb, so use an unconverted shot
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    fn(shot)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return {"name": name, "cpu_us": cpu_us, "peak_kib": peak / 1024,
+            "frames_alloc": peak / len(shot.raw), "bytes_out": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=116)
+    parser.add_argument("--height", type=int, default=40)
+    parser.add_argument("--frames", type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"=== Encode benchmark: {args.width}x{args.height}, {args.frames} frames ===")
+    variants = [("PIL frombytes + PNG (old)", old_path)]
+    for fmt in ("png", "jpeg", "raw"):
+        settings = dict(scan_deposits.ENCODING, format=fmt)
+        variants.append((f"view + {fmt} ({'grey' if settings['grayscale'] else 'colour'})",
+                         new_path(scan_deposits.FrameEncoder(settings))))
+
+    print(f"{'path':36} {'cpu us/frame':>13} {'peak KiB':>9} {'x frame':>8} {'bytes':>7}")
+    for name, fn in variants:
+        shots = [make_shot(args.width, args.height) for _ in range(args.frames)]
+        r = measure(name, fn, shots)
+        print(f"{r['name']:36} {r['cpu_us']:13.1f} {r['peak_kib']:9.1f} {r['frames_alloc']:8.2f} {r['bytes_out']:7d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Scan history benchmark: what ScanHistory.record() costs the scan path, how fast
+the background writer stores batches, and how long the /history and
+/history/stats queries take on a large database.
+
+The database is filled with synthetic scans spread over --days (deposit keys
+from the real rock data), in a temporary file that is deleted afterwards.
+
+Usage:
+    python benchmarks/bench_history.py [--rows 1000000] [--days 30] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import scan_deposits  # noqa: E402
+
+SOURCES = ("continuous", "continuous", "continuous", "hotkey", "gui")
+
+
+def synthetic_rows(count, days, rng):
+    codes = [(str(code), best) for code, best in scan_deposits.CODE_INDEX.items()]
+    start = time.time() - days * 86400
+    step = days * 86400 / count
+    for i in range(count):
+        if rng.random() < 0.1:  # unreadable / unknown codes
+            code, key, deposits = str(rng.randint(100, 99999)), None, None
+        else:
+            code, best = rng.choice(codes)
+            key, deposits = best["key"], best["deposits"]
+        yield (start + i * step, code, code, key, deposits, round(rng.random(), 3),
+               rng.uniform(50, 900), rng.choice(SOURCES))
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--queries", type=int, default=200, help="runs per query")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        history = scan_deposits.ScanHistory(os.path.join(tmp, "history.db"), queue_size=args.rows + 1)
+        history.start()
+        print(f"=== Scan history benchmark: {args.rows} rows over {args.days:g} days ===")
+
+        # Scan-path cost: record() only enqueues
+        result = {"code": "18000", "raw_text": "18000", "confidence": 1.0, "info": {"key": "ATACAMITE", "deposits": 10}}
+        n = min(args.rows, 100_000)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            history.record(result, "continuous", 120.0)
+        record_us = (time.perf_counter() - t0) / n * 1e6
+        history.close(timeout=600)
+        print(f"{'record() per call':28} {record_us:8.2f} µs  ({history.counters['dropped']} dropped)")
+
+        # Writer throughput: the same batches the background thread writes
+        conn = history._connect()
+        rows = list(synthetic_rows(args.rows - n, args.days, rng))
+        t0 = time.perf_counter()
+        for i in range(0, len(rows), history.batch_size):
+            history._write(conn, rows[i:i + history.batch_size])
+        write_s = time.perf_counter() - t0
+        conn.close()
+        print(f"{'batched writes':28} {len(rows) / write_s:8.0f} rows/s  "
+              f"(batch {history.batch_size}, {os.path.getsize(history.path) / 2**20:.0f} MiB)")
+
+        now = time.time()
+        day_ago = now - 86400
+        keys = sorted({info["key"] for info in scan_deposits.CODE_INDEX.values()})
+        newest = history.page(limit=100)
+        middle = history.page(until=now - args.days * 86400 / 2, limit=1)["next"]
+        deep = history.page(before=middle, limit=100)
+        print(f"{'page sizes':28} {len(newest['items'])} newest, {len(deep['items'])} from the middle")
+        queries = [
+            ("page: newest 100", lambda: history.page(limit=100)),
+            ("page: middle of table", lambda: history.page(before=middle, limit=100)),
+            ("page: one key, last day", lambda: history.page(since=day_ago, key=rng.choice(keys), limit=100)),
+            ("page: one key, all time", lambda: history.page(key=rng.choice(keys), limit=100)),
+            ("page: until a week ago", lambda: history.page(until=now - 7 * 86400, limit=100)),
+            ("page: one key, until", lambda: history.page(until=now - 7 * 86400, key=rng.choice(keys), limit=100)),
+            ("page: one source", lambda: history.page(source="gui", limit=100)),
+            ("stats: all time", lambda: history.aggregate()),
+            ("stats: last day", lambda: history.aggregate(since=day_ago)),
+            ("stats: one key", lambda: history.aggregate(key=rng.choice(keys))),
+        ]
+        print(f"{'query':28} {'median ms':>10} {'max ms':>10}")
+        for label, fn in queries:
+            median, worst = timed(fn, args.queries)
+            print(f"{label:28} {median:10.3f} {worst:10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
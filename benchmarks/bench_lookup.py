@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lookup_deposit via the precomputed CODE_INDEX vs. the old linear
+`num_code % base_code` scan over MULTIPLIER_CODES.
+
+Also lists the codes the old scan resolved differently (it returned the first
+divisor in dict order) so ranking changes are visible.
+
+Usage:
+    python benchmarks/bench_lookup.py [--rounds 200]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import scan_deposits  # noqa: E402
+
+
+def legacy_lookup(code):
+    """lookup_deposit as it was before the index (first matching divisor wins)."""
+    if not code:
+        return None
+    m = re.search(r"(\d+)$", code)
+    if not m:
+        return None
+    num_code = int(m.group(1))
+    for base_code, info in scan_deposits.MULTIPLIER_CODES.items():
+        if num_code % base_code == 0:
+            return {"name": info["display_name"], "key": info["key"], "base_code": base_code,
+                    "deposits": num_code // base_code}
+    return None
+
+
+def sample_codes():
+    """Every indexed code, plus the unreadable values seen in scanning_tool.log."""
+    codes = [str(c) for c in scan_deposits.CODE_INDEX]
+    codes += ["12500", "12580", "123", "123456", "1234567890", "9.600", "A-18000", ""]
+    return codes
+
+
+def time_per_call(fn, codes, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for code in codes:
+            fn(code)
+    return (time.perf_counter() - t0) / (rounds * len(codes)) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    codes = sample_codes()
+
+    t_build = time.perf_counter()
+    scan_deposits.build_code_index(scan_deposits.ROCK_DATA)
+    build_ms = (time.perf_counter() - t_build) * 1000
+
+    print(f"=== Lookup benchmark: {len(codes)} codes x {args.rounds} rounds ===")
+    print(f"Index: {len(scan_deposits.CODE_INDEX)} codes, built in {build_ms:.2f} ms")
+    legacy_ns = time_per_call(legacy_lookup, codes, args.rounds)
+    index_ns = time_per_call(scan_deposits.lookup_deposit, codes, args.rounds)
+    print(f"{'legacy modulo scan':24} {legacy_ns:8.0f} ns/lookup")
+    print(f"{'indexed lookup':24} {index_ns:8.0f} ns/lookup  ({legacy_ns / index_ns:.1f}x)")
+
+    print()
+    print("Ambiguous codes (chosen reading first):")
+    for code, best in sorted(scan_deposits.CODE_INDEX.items()):
+        if best["ambiguous"]:
+            readings = ", ".join(f"{c['name']} x{c['deposits']} ({c['probability']:.0%})"
+                                 for c in [best] + best["alternatives"])
+            print(f"  {code:>6}: {readings}")
+
+    print()
+    print("Codes resolved differently than before:")
+    changed = 0
+    for code in codes:
+        old, new = legacy_lookup(code), scan_deposits.lookup_deposit(code)
+        old_s = f"{old['name']} x{old['deposits']}" if old else "-"
+        new_s = f"{new['name']} x{new['deposits']}" if new else "-"
+        if old_s != new_s:
+            changed += 1
+            print(f"  {code or '(empty)':>10}: {old_s} -> {new_s}")
+    print(f"{changed} changed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
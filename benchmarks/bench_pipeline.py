@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+End-to-end stage benchmark: replays a corpus of ROI frames with known codes through
+decode -> preprocess -> OCR backend -> extract_code_from_text -> lookup_deposit.
+
+For every stage it reports p50/p95/p99 latency, throughput and the traced
+allocation peak per frame, plus read/lookup accuracy (overall and per separator,
+resolution and font). Results are written as JSON so runs can be compared across
+commits (--compare).
+
+The default mock backend replays the ground truth, so it measures everything but
+the engine; use --backend ollama / opencv / cascade to measure a real engine.
+Build the corpus first with make_corpus.py.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--corpus benchmarks/corpus] [--backend mock]
+                                        [--repeat 3] [--teach-local] [--out FILE]
+                                        [--compare OLD.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import scan_deposits  # noqa: E402
+
+STAGES = ("decode", "preprocess", "ocr", "extract", "lookup")
+
+
+def load_corpus(path):
+    with open(os.path.join(path, "manifest.json")) as f:
+        manifest = json.load(f)
+    for item in manifest:
+        with open(os.path.join(path, item["file"]), "rb") as f:
+            item["png"] = np.frombuffer(f.read(), np.uint8)
+    return manifest
+
+
+def decode(png):
+    """PNG bytes -> BGRA frame, the layout CaptureEngine hands out."""
+    frame = cv2.imdecode(png, cv2.IMREAD_UNCHANGED)
+    if frame.ndim == 2:
+        return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+    if frame.shape[2] == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+    return frame
+
+
+def run_frame(item, backend, timings=None):
+    """One frame through every stage; fills timings[stage] with seconds if given."""
+    marks = [time.perf_counter()]
+    frame = decode(item["png"])
+    marks.append(time.perf_counter())
+    model_input = scan_deposits.preprocess_roi(frame) if scan_deposits.PREPROCESS["enabled"] else frame
+    marks.append(time.perf_counter())
+    answer = backend.read(model_input, scan_deposits.to_gray(frame))
+    marks.append(time.perf_counter())
+    code, _ = scan_deposits.extract_code_from_text(answer.text)
+    marks.append(time.perf_counter())
+    info = scan_deposits.lookup_deposit(code)
+    marks.append(time.perf_counter())
+    if timings is not None:
+        for stage, t0, t1 in zip(STAGES, marks, marks[1:]):
+            timings[stage].append(t1 - t0)
+    return code, info
+
+
+def stage_allocations(corpus, backend):
+    """Traced allocation peak (bytes) of each stage, per frame; a separate pass so tracing doesn't skew timing."""
+    peaks = defaultdict(list)
+    steps = {
+        "decode": lambda ctx: ctx.update(frame=decode(ctx["item"]["png"])),
+        "preprocess": lambda ctx: ctx.update(model_input=scan_deposits.preprocess_roi(ctx["frame"])
+                                             if scan_deposits.PREPROCESS["enabled"] else ctx["frame"]),
+        "ocr": lambda ctx: ctx.update(answer=backend.read(ctx["model_input"], scan_deposits.to_gray(ctx["frame"]))),
+        "extract": lambda ctx: ctx.update(code=scan_deposits.extract_code_from_text(ctx["answer"].text)[0]),
+        "lookup": lambda ctx: ctx.update(info=scan_deposits.lookup_deposit(ctx["code"])),
+    }
+    tracemalloc.start()
+    for item in corpus:
+        ctx = {"item": item}
+        for stage in STAGES:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            else:  # Python 3.8: restarting tracing resets the peak
+                tracemalloc.stop()
+                tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            steps[stage](ctx)
+            peaks[stage].append(tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+    return peaks
+
+
+def percentiles_ms(samples):
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 4), "p95_ms": round(float(p95), 4), "p99_ms": round(float(p99), 4),
+            "mean_ms": round(float(np.mean(samples)) * 1000, 4),
+            "throughput_per_s": round(len(samples) / sum(samples), 1) if sum(samples) else None}
+
+
+def make_backend(name, corpus):
+    settings = dict(scan_deposits.OCR_BACKEND, name=name)
+    if name == "mock":
+        settings["mock_answers"] = [item.get("text", item["code"]) for item in corpus]
+    scan_deposits.OCR_BACKEND.update(settings)
+    scan_deposits.init_ocr_backend()
+    return scan_deposits.ocr_backend
+
+
+def teach_local_reader(corpus):
+    """Fresh in-memory local reader taught from every other frame (never saved)."""
+    recognizer = scan_deposits.DigitRecognizer(os.devnull, int(scan_deposits.LOCAL_OCR["max_samples_per_digit"]))
+    for item in corpus[::2]:
+        recognizer.learn(scan_deposits.to_gray(decode(item["png"])), item["code"])
+    scan_deposits.digit_recognizer = recognizer
+
+
+def git_revision():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "--", "scan_deposits.py"]).returncode != 0
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(result, old):
+    print()
+    print(f"=== vs {old['revision']} ({old['backend']}) ===")
+    for stage in STAGES:
+        new_s, old_s = result["stages"][stage], old["stages"].get(stage)
+        if not old_s:
+            continue
+        print(f"{stage:12} p50 {old_s['p50_ms']:9.3f} -> {new_s['p50_ms']:9.3f} ms   "
+              f"p95 {old_s['p95_ms']:9.3f} -> {new_s['p95_ms']:9.3f} ms")
+    for key in ("code", "deposit"):
+        print(f"{key + ' accuracy':20} {old['accuracy'][key]:.1%} -> {result['accuracy'][key]:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--backend", default="mock", choices=sorted(scan_deposits.OCR_BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus for the timing run")
+    parser.add_argument("--teach-local", action="store_true",
+                        help="teach the local digit reader from every other frame first (opencv/cascade)")
+    parser.add_argument("--out", help="result JSON (default benchmarks/results/<revision>-<backend>.json)")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.corpus, "manifest.json")):
+        print(f"No corpus in {args.corpus}; run benchmarks/make_corpus.py first.")
+        return 1
+    corpus = load_corpus(args.corpus)
+    scan_deposits.init_digit_recognizer()
+    if args.teach_local:
+        teach_local_reader(corpus)
+
+    # Accuracy pass (also warms up caches and the engine)
+    backend = make_backend(args.backend, corpus)
+    groups = defaultdict(lambda: [0, 0])
+    code_ok = deposit_ok = 0
+    for item in corpus:
+        code, info = run_frame(item, backend)
+        expected = scan_deposits.lookup_deposit(item["code"])
+        hit = code == item["code"]
+        code_ok += hit
+        deposit_ok += bool(info and expected and info["key"] == expected["key"]
+                           and info["deposits"] == expected["deposits"])
+        for dim in ("separator", "resolution", "font"):
+            if dim in item:
+                groups[f"{dim}={item[dim]}"][0] += hit
+                groups[f"{dim}={item[dim]}"][1] += 1
+
+    backend = make_backend(args.backend, corpus)  # mock answers start over
+    timings = defaultdict(list)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        for item in corpus:
+            run_frame(item, backend, timings)
+    wall = time.perf_counter() - t0
+
+    backend = make_backend(args.backend, corpus)
+    peaks = stage_allocations(corpus, backend)
+
+    result = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "engines": backend.engines(),
+        "preprocess": dict(scan_deposits.PREPROCESS),
+        "frames": len(corpus),
+        "repeat": args.repeat,
+        "end_to_end": dict(percentiles_ms([sum(t) for t in zip(*(timings[s] for s in STAGES))]),
+                           frames_per_s=round(len(corpus) * args.repeat / wall, 1)),
+        "stages": {s: dict(percentiles_ms(timings[s]),
+                           alloc_peak_kib_p50=round(float(np.median(peaks[s])) / 1024, 2),
+                           alloc_peak_kib_max=round(max(peaks[s]) / 1024, 2)) for s in STAGES},
+        "accuracy": {"code": code_ok / len(corpus), "deposit": deposit_ok / len(corpus),
+                     "by_group": {k: round(ok / n, 4) for k, (ok, n) in sorted(groups.items())}},
+    }
+
+    print(f"=== Pipeline benchmark: {len(corpus)} frames x {args.repeat}, backend {args.backend} "
+          f"({', '.join(result['engines'])}) @ {result['revision']} ===")
+    print(f"{'stage':12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>10} {'alloc KiB':>10}")
+    for stage in STAGES:
+        r = result["stages"][stage]
+        print(f"{stage:12} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {r['p99_ms']:9.3f} "
+              f"{r['throughput_per_s'] or 0:10.1f} {r['alloc_peak_kib_p50']:10.2f}")
+    e2e = result["end_to_end"]
+    print(f"{'end-to-end':12} {e2e['p50_ms']:9.3f} {e2e['p95_ms']:9.3f} {e2e['p99_ms']:9.3f} "
+          f"{e2e['frames_per_s']:10.1f}")
+    print(f"Accuracy: code {result['accuracy']['code']:.1%}, deposit {result['accuracy']['deposit']:.1%}")
+    for group, acc in result["accuracy"]["by_group"].items():
+        print(f"  {group:22} {acc:.1%}")
+
+    out = args.out or os.path.join("benchmarks", "results", f"{result['revision']}-{args.backend}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(result, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long `import scan_deposits` takes, which heavy modules
+it pulls in eagerly and how much memory the process holds afterwards, measured
+in fresh interpreters.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line.
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import scan_deposits
+import_s = time.perf_counter() - t0
+heavy = [m for m in ("cv2", "numpy", "mss", "ollama", "flask", "keyboard", "PIL") if m in sys.modules]
+
+t0 = time.perf_counter()
+scan_deposits.format_deposit_table("STANTON", "GRANITE")
+first_table_s = time.perf_counter() - t0
+
+try:
+    import resource
+    rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kib //= 1024
+except ImportError:  # Windows
+    try:
+        import psutil
+        rss_kib = psutil.Process().memory_info().rss // 1024
+    except ImportError:
+        rss_kib = 0
+
+print(json.dumps({"import_s": import_s, "first_table_s": first_table_s, "rss_kib": rss_kib,
+                  "heavy": heavy}))
+"""
+
+
+def run_probe():
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=REPO_ROOT, capture_output=True,
+                         text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_probe() for _ in range(args.runs)]
+    print(f"=== Startup benchmark: {args.runs} fresh interpreters ===")
+    for key, label, scale, unit in (("import_s", "import scan_deposits", 1000, "ms"),
+                                    ("first_table_s", "first deposit table", 1000, "ms"),
+                                    ("rss_kib", "peak RSS after import", 1 / 1024, "MiB")):
+        values = [r[key] * scale for r in results]
+        print(f"{label:24} median {statistics.median(values):8.2f} {unit}   "
+              f"min {min(values):8.2f}   max {max(values):8.2f}")
+    print(f"{'loaded on import':24} {', '.join(results[0]['heavy']) or '(none)'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
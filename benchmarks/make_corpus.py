@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Build a corpus of ROI frames with known ground-truth codes for bench_pipeline.py.
+
+Frames are rendered deterministically (fixed --seed) so every commit is measured
+on the same pixels. They cover the separators the game shows ('12.000', '12,000',
+'12000'), several ROI resolutions and OpenCV fonts, on a noisy dark background
+like the in-game scanner readout.
+
+Recorded frames can be added to the same directory: save the ROI as a PNG and add
+{"file": ..., "code": ...} to manifest.json (code = digits only, e.g. "12000").
+
+Usage:
+    python benchmarks/make_corpus.py [--out benchmarks/corpus] [--frames 240] [--seed 7]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+import scan_deposits  # noqa: E402
+
+SEPARATORS = {"dot": ".", "comma": ",", "none": ""}
+# (width, height) of the captured ROI; 160x30 is the default CAP_REGION
+RESOLUTIONS = [(116, 24), (160, 30), (200, 40), (300, 60)]
+FONTS = {"simplex": cv2.FONT_HERSHEY_SIMPLEX, "duplex": cv2.FONT_HERSHEY_DUPLEX,
+         "plain": cv2.FONT_HERSHEY_PLAIN, "complex": cv2.FONT_HERSHEY_COMPLEX}
+
+
+def format_code(code, separator):
+    """12000 -> '12.000' / '12,000' / '12000'."""
+    digits = str(code)
+    if not separator or len(digits) <= 3:
+        return digits
+    return f"{digits[:-3]}{separator}{digits[-3:]}"
+
+
+def render(text, width, height, font, rng):
+    """BGRA frame with `text` roughly as the scanner shows it."""
+    bg = rng.randint(10, 45)
+    frame = np.full((height, width, 4), 255, np.uint8)
+    frame[..., :3] = np.clip(np.random.default_rng(rng.randint(0, 2**31)).normal(bg, 4, (height, width, 3)),
+                             0, 255).astype(np.uint8)
+    thickness = 1 if height < 30 or font == cv2.FONT_HERSHEY_PLAIN else 2
+    scale = cv2.getFontScaleFromHeight(font, int(height * 0.55), thickness)
+    (tw, th), _ = cv2.getTextSize(text, font, scale, thickness)
+    if tw > width - 8:  # long codes on narrow ROIs: shrink to fit
+        scale *= (width - 8) / tw
+        (tw, th), _ = cv2.getTextSize(text, font, scale, thickness)
+    x = rng.randint(2, max(2, width - tw - 2))
+    y = (height + th) // 2 + rng.randint(-1, 1)
+    colour = (rng.randint(200, 255), rng.randint(200, 255), rng.randint(150, 230), 255)
+    cv2.putText(frame, text, (x, y), font, scale, colour, thickness, cv2.LINE_AA)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=os.path.join("benchmarks", "corpus"))
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    codes = sorted(scan_deposits.CODE_INDEX)
+    os.makedirs(args.out, exist_ok=True)
+    manifest = []
+    for i in range(args.frames):
+        code = rng.choice(codes)
+        sep_name = list(SEPARATORS)[i % len(SEPARATORS)]
+        width, height = RESOLUTIONS[(i // len(SEPARATORS)) % len(RESOLUTIONS)]
+        font_name = rng.choice(list(FONTS))
+        text = format_code(code, SEPARATORS[sep_name])
+        name = f"{i:04d}_{code}_{sep_name}_{width}x{height}_{font_name}.png"
+        cv2.imwrite(os.path.join(args.out, name), render(text, width, height, FONTS[font_name], rng))
+        manifest.append({"file": name, "code": str(code), "text": text, "separator": sep_name,
+                         "resolution": f"{width}x{height}", "font": font_name})
+
+    with open(os.path.join(args.out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    print(f"Wrote {len(manifest)} frames to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
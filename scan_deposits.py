@@ -1,26 +1,63 @@
+from __future__ import annotations  # annotations like np.ndarray must not import numpy
+
 import time
 import re
 import json
-import io
 import base64
 import os
 import sys
-from threading import Thread
-from PIL import Image
-import cv2
-import numpy as np
-import mss
-import ollama
-from flask import Flask, jsonify, render_template_string, request, render_template
+import hashlib
+import functools
+import bisect
+import itertools
+import asyncio
+import argparse
+import concurrent.futures
+import importlib
+from collections import Counter, OrderedDict, deque, namedtuple
+from threading import Thread, Lock, Event, Condition, local
 import tkinter as tk
-from tkinter import ttk, colorchooser
-import keyboard  # hotkey support
+from tkinter import ttk, colorchooser, simpledialog
 import tkinter.messagebox as messagebox
 import subprocess
 import shutil
 import webbrowser
 import logging
 import logging.handlers
+import queue
+import sqlite3
+import zipfile
+import atexit
+
+
+class _LazyModule:
+    """Stand-in for a heavy module, imported on first attribute access.
+
+    Keeps cv2/numpy/mss/ollama/flask/keyboard off the startup path so the window
+    shows first; run_preflight() warms the ones every scan needs in the background.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _import(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._import(), attr)
+
+
+cv2 = _LazyModule("cv2")
+np = _LazyModule("numpy")
+mss = _LazyModule("mss")
+ollama = _LazyModule("ollama")
+httpx = _LazyModule("httpx")
+flask = _LazyModule("flask")
+keyboard = _LazyModule("keyboard")  # hotkey support
+multiprocessing = _LazyModule("multiprocessing")  # replay only
 
 # ---- ROI/Overlay constants (global defaults) ----
 ASPECT_W, ASPECT_H = 130, 44
@@ -29,33 +66,105 @@ REGION_GUI_W, REGION_GUI_H = REGION_BASE_W // 2, REGION_BASE_H // 2
 REGION_ANCHOR = {"left": 0, "top": 0}
 OVERLAY_FOLLOWS_ROI = True
 
-# Configure logging to both console and file
+# Logging to both console and file is set up by setup_logging(), in the main
+# process only
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-# Create formatter
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Scan results that repeat the previous one are counted instead of logged, with a
+# summary line at least every repeat_summary_seconds while the repeats last
+LOGGING = {"aggregate_repeats": True, "repeat_summary_seconds": 60}
+
+
+class RepeatAggregator(logging.Filter):
+    """Collapses runs of identical scan records (extra={"scan": ...}) into summary lines."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = Lock()
+        self._key = None
+        self._repeats = 0
+        self._since = 0.0
+
+    @staticmethod
+    def _scan_key(scan):
+        info = scan.get("info") or {}
+        return scan.get("code"), info.get("name"), info.get("deposits"), tuple(sorted((scan.get("fields") or {}).items()))
+
+    def filter(self, record):
+        scan = getattr(record, "scan", None)
+        if scan is None or not LOGGING["aggregate_repeats"]:
+            return True
+        key = self._scan_key(scan)
+        with self._lock:
+            changed = key != self._key
+            if not changed:
+                self._repeats += 1
+                if record.created - self._since < float(LOGGING["repeat_summary_seconds"]):
+                    return False
+            repeats, since = self._repeats, self._since
+            self._key, self._repeats, self._since = key, 0, record.created
+        if repeats:
+            logger.info("Previous scan result repeated %d more times over %.1f s", repeats, record.created - since)
+        return changed  # a run that only reached the summary interval is reported by the summary
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() renders the message in the caller's thread; here only
+    exception info is rendered early (tracebacks can't cross threads safely),
+    so `msg % args` and the formatter run on the listener thread.
+    """
 
-# Console handler
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(formatter)
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-# File handler with rotation (keeps last 5 files, max 10MB each)
-file_handler = logging.handlers.RotatingFileHandler(
-    'scanning_tool.log', 
-    maxBytes=10*1024*1024,  # 10MB
-    backupCount=5
-)
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(formatter)
 
-# Add handlers to logger
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+log_listener = None
+
+
+def setup_logging():
+    """Console and rotating file handlers behind a queue listener.
+
+    Scan threads only enqueue records; console and file I/O (including rotation)
+    run on the listener thread. Called from __main__ only, so processes that
+    import the module (replay workers under spawn, tests, benchmarks) never
+    open scanning_tool.log themselves.
+    """
+    global log_listener
+    if log_listener is not None:
+        return
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(formatter)
+    # File handler with rotation (keeps last 5 files, max 10MB each)
+    file_handler = logging.handlers.RotatingFileHandler(
+        'scanning_tool.log',
+        maxBytes=10*1024*1024,  # 10MB
+        backupCount=5
+    )
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RepeatAggregator())
+    logger.addHandler(queue_handler)
+    log_listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)  # flush what is still queued
+
+
+def forward_logging(worker_queue):
+    """Worker processes: send records to the parent, which writes them (see run_replay)."""
+    logger.handlers[:] = [logging.handlers.QueueHandler(worker_queue)]
 
 def ensure_ollama_installed():
     """
@@ -223,25 +332,123 @@ def ensure_model_installed(model="qwen2.5vl:3b"):
         result = subprocess.run(["ollama", "list"], capture_output=True, text=True)
         if model not in result.stdout:
             logger.info(f"Model {model} not found. Pulling now...")
+            PREFLIGHT["detail"] = f"Lade Modell {model} herunter..."
             subprocess.run(["ollama", "pull", model], check=True)
             logger.info(f"Model {model} installed successfully.")
         else:
             logger.info(f"Model {model} already installed.")
     except Exception as e:
         logger.error(f"Error ensuring model: {e}")
-        sys.exit("Failed to ensure Ollama model.")
+        raise RuntimeError("Failed to ensure Ollama model.") from e
+
+
+# ---------- Background Preflight ----------
+# state: pending -> checking -> ready | error; shown in the GUI and /status
+PREFLIGHT = {"state": "pending", "detail": "", "ollama_version": None, "seconds": None}
+
+
+def run_preflight(model=None):
+    """Startup work that must not delay the window: start the capture engine, warm
+    heavy imports, load the OCR cache and glyphs, then check Ollama and the model."""
+    model = model or OLLAMA_MODEL
+    t0 = time.perf_counter()
+    PREFLIGHT.update(state="checking", detail="Lade Bibliotheken...")
+    try:
+        capture_engine.start()
+        for module in (np, cv2, ollama):  # import now rather than on the first scan
+            module._import()
+        init_ocr_cache()
+        init_digit_recognizer()
+        if not ocr_uses_ollama():
+            PREFLIGHT.update(state="ready", detail=f"OCR ohne KI-Modell ({OCR_BACKEND['name']})")
+            return
+        if ollama_endpoint.is_local():
+            PREFLIGHT["detail"] = "Prüfe Ollama..."
+            version = subprocess.check_output(["ollama", "--version"], text=True, timeout=30).strip()
+            PREFLIGHT["ollama_version"] = version
+            logger.info(f"Ollama found: {version}")
+            PREFLIGHT["detail"] = f"Prüfe Modell {model}..."
+            ensure_model_installed(model)
+        else:
+            # Shared inference server: nothing to install here, only check it serves the model
+            PREFLIGHT["detail"] = f"Prüfe Modell {model} auf {OLLAMA['host']}..."
+            ollama_endpoint.request("show", model=model)
+            logger.info(f"Model {model} available on {OLLAMA['host']}")
+        PREFLIGHT["detail"] = f"Lade Modell {model} in den Grafikspeicher..."
+        model_manager.warm_up()
+        PREFLIGHT.update(state="ready", detail=f"Modell {model} bereit")
+    except Exception as e:
+        logger.error(f"Preflight failed: {e}")
+        PREFLIGHT.update(state="error", detail=str(e))
+    finally:
+        PREFLIGHT["seconds"] = round(time.perf_counter() - t0, 2)
+        logger.info(f"Preflight {PREFLIGHT['state']} after {PREFLIGHT['seconds']} s")
 
 
 
 # ---------- CONFIG ----------
 CONFIG_FILE = "config.json"
 
-CAP_REGION = {"left": 1260, "top": 310, "width": 160, "height": 30}
+CAP_REGION = {"name": "code", "left": 1260, "top": 310, "width": 160, "height": 30}
+# Named screen regions, grabbed together as one bounding box. "code" is the deposit
+# code (always CAP_REGION itself); further entries such as
+# {"name": "mass", "left": ..., "top": ..., "width": ..., "height": ...} are HUD
+# readouts read alongside it (see FieldReader)
+ROIS = [CAP_REGION]
 label_color = "yellow"
 MIN_CONFIDENCE = 0.65
+# Continuous mode publishes a code once `required` of the last `window` reads agree
+STABILIZER = {"window": 4, "required": 3}
 DEBUG_SHOW_OVERLAY = True
 OLLAMA_MODEL = "qwen2.5vl:3b"   # vision model
 
+# Persistent screen grabber (see CaptureEngine): grab rate and ring buffer length
+CAPTURE = {"fps": 10, "buffer_size": 8}
+
+# How frames are handed to the vision model (see FrameEncoder).
+# format: "png" | "jpeg" | "raw" (uncompressed BMP); max_height 0 = no downscaling
+ENCODING = {"format": "png", "png_compression": 1, "jpeg_quality": 90,
+            "grayscale": True, "max_height": 0}
+
+# Shrink the ROI before it goes to the model (see preprocess_roi)
+PREPROCESS = {"enabled": True, "crop": True, "binarize": True, "target_height": 32, "pad": 6}
+
+# Continuous mode scan interval bounds (seconds) and the share of wall time the
+# model may be kept busy (see AdaptiveScheduler). max_interval is also how long a
+# new deposit can go unnoticed, so keep it at or below the old fixed 2 s.
+SCHEDULER = {"min_interval": 0.25, "max_interval": 2.0, "backoff": 1.5, "duty_cycle": 0.5}
+
+# Skip the model call when the ROI has not changed since the last scan.
+# The ROI counts as changed once min_changed_cells cells of its 32x12 thumbnail
+# moved by more than pixel_threshold grey levels (0-255).
+CHANGE_DETECTION = {"enabled": True, "pixel_threshold": 24, "min_changed_cells": 2}
+
+# Persistent OCR answer cache keyed by ROI fingerprint (see OCRResultCache),
+# written every save_interval seconds while it has new entries and at exit
+OCR_CACHE_FILE = "ocr_cache.json"
+OCR_CACHE = {"enabled": True, "max_entries": 1024, "ttl_seconds": 7 * 24 * 3600, "save_interval": 60}
+# Local OpenCV digit recognizer tried before the vision model (see DigitRecognizer);
+# learned glyphs are written every save_interval seconds while new ones arrive and at exit
+GLYPH_FILE = "digit_glyphs.npz"
+LOCAL_OCR = {"enabled": True, "min_confidence": 0.8, "max_samples_per_digit": 40, "save_interval": 60}
+# Ollama endpoint (see OllamaEndpoint). host "" = library default (OLLAMA_HOST or
+# localhost:11434); failed calls are retried with exponential backoff while the
+# retry budget lasts
+OLLAMA = {"host": "", "connect_timeout": 5.0, "read_timeout": 60.0, "max_connections": 4,
+          "retries": 2, "backoff": 0.5, "retry_budget_seconds": 10.0}
+# Which engine reads the ROI (see OCR Backends): "ollama", "opencv", "mock" or
+# "cascade" (tries the engines in `cascade` order, cheapest first)
+OCR_BACKEND = {"name": "ollama", "cascade": ["opencv", "ollama"],
+               "mock_answers": ["12000"], "mock_latency_ms": 0}
+# Every published result is appended to a SQLite history (see ScanHistory),
+# written in batches of up to batch_size rows at least every flush_seconds
+HISTORY_FILE = "scan_history.db"
+HISTORY = {"enabled": True, "batch_size": 200, "flush_seconds": 1.0}
+# Vision model residency (see ModelManager): warm up at startup, unload after
+# idle_unload_seconds without a scan (0 = leave it to Ollama's default keep-alive)
+MODEL_LIFECYCLE = {"warmup": True, "idle_unload_seconds": 300}
+OCR_PROMPT = "Extract the numeric code shown in this image. Only return the code, no extra words."
+
 # Regex for codes
 CODE_RE = re.compile(
     r"(?:[A-Za-z]?-?\d[\d,\.]{1,10}|\d{2,10})",
@@ -249,18 +456,42 @@ CODE_RE = re.compile(
 )
 
 last_result = {"code": None, "code_raw": None, "info": None,
-               "confidence": 0.0, "raw_text": ""}
+               "confidence": 0.0, "raw_text": "", "fields": {}}
 
 
 # ---------- Config Handling ----------
+def set_rois(rois, cap_region):
+    """Make ROIS/CAP_REGION consistent: CAP_REGION is the "code" entry of ROIS."""
+    global ROIS, CAP_REGION
+    rois = [dict(r) for r in rois or [] if r.get("name")]
+    code = next((r for r in rois if r["name"] == "code"), None)
+    if code is None:
+        code = dict(cap_region, name="code")
+        rois.insert(0, code)
+    ROIS, CAP_REGION = rois, code
+
+
 def load_config():
     global CAP_REGION, label_color
     if os.path.exists(CONFIG_FILE):
         try:
             with open(CONFIG_FILE, "r") as f:
                 data = json.load(f)
-                CAP_REGION = data.get("CAP_REGION", CAP_REGION)
+                set_rois(data.get("ROIS"), data.get("CAP_REGION", CAP_REGION))
                 label_color = data.get("label_color", label_color)
+                CAPTURE.update(data.get("CAPTURE", {}))
+                ENCODING.update(data.get("ENCODING", {}))
+                PREPROCESS.update(data.get("PREPROCESS", {}))
+                CHANGE_DETECTION.update(data.get("CHANGE_DETECTION", {}))
+                SCHEDULER.update(data.get("SCHEDULER", {}))
+                STABILIZER.update(data.get("STABILIZER", {}))
+                OCR_CACHE.update(data.get("OCR_CACHE", {}))
+                LOCAL_OCR.update(data.get("LOCAL_OCR", {}))
+                MODEL_LIFECYCLE.update(data.get("MODEL_LIFECYCLE", {}))
+                OLLAMA.update(data.get("OLLAMA", {}))
+                OCR_BACKEND.update(data.get("OCR_BACKEND", {}))
+                LOGGING.update(data.get("LOGGING", {}))
+                HISTORY.update(data.get("HISTORY", {}))
         except (json.JSONDecodeError, OSError) as e:
             logger.warning(f"Config file invalid or empty, resetting: {e}")
             save_config()
@@ -271,7 +502,13 @@ def load_config():
 
 def save_config():
     global CAP_REGION, label_color
-    data = {"CAP_REGION": CAP_REGION, "label_color": label_color}
+    data = {"CAP_REGION": CAP_REGION, "ROIS": ROIS, "label_color": label_color, "CAPTURE": CAPTURE,
+            "ENCODING": ENCODING, "PREPROCESS": PREPROCESS, "CHANGE_DETECTION": CHANGE_DETECTION,
+            "SCHEDULER": SCHEDULER,
+            "STABILIZER": STABILIZER, "OCR_CACHE": OCR_CACHE,
+            "LOCAL_OCR": LOCAL_OCR, "MODEL_LIFECYCLE": MODEL_LIFECYCLE,
+            "OLLAMA": OLLAMA, "OCR_BACKEND": OCR_BACKEND, "LOGGING": LOGGING,
+            "HISTORY": HISTORY}
     with open(CONFIG_FILE, "w") as f:
         json.dump(data, f, indent=4)
     logger.info("Config saved.")
@@ -324,54 +561,571 @@ for tier, data in ORE_TIERS.items():
         ORE_VALUE_MAP[ore.upper()] = {"tier": tier, "color": data["color"]}
 
 
-# ---------- Build Deposit Tables ----------
-def build_deposit_tables(rock_data):
-    deposit_tables = {}
-    for deposit_name, details in rock_data.items():
-        ores = details.get("ores", {})
-        table = []
-        for ore_name, ore_data in ores.items():
-            name_up = ore_name.upper()
-            value_info = ORE_VALUE_MAP.get(name_up, {"tier": "OTHER", "color": "#888"})
-            table.append({
-                "name": ore_name.title(),
-                "prob": f"{ore_data.get('prob', 0)*100:.0f}%",
-                "min": f"{ore_data.get('minPct', 0)*100:.0f}%",
-                "max": f"{ore_data.get('maxPct', 0)*100:.0f}%",
-                "med": f"{ore_data.get('medPct', 0)*100:.0f}%",
-                "tier": value_info["tier"],
-                "color": value_info["color"]
-            })
-        tier_order = ["HIGHEST", "HIGH", "MEDIUM", "LOW", "OTHER"]
-        table.sort(key=lambda x: tier_order.index(x["tier"]))
-        deposit_tables[deposit_name.upper()] = table
-    return deposit_tables
-
-DEPOSIT_TABLES = {
-    "STANTON": build_deposit_tables(ROCK_DATA.get("STANTON", {})),
-    "PYRO": build_deposit_tables(ROCK_DATA.get("PYRO", {}))
-}
+# ---------- Deposit Tables ----------
+# Built per (system, deposit) on first use and memoised; rows stay numeric until rendered.
+TIER_RANK = {"HIGHEST": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3, "OTHER": 4}
+OTHER_TIER = {"tier": "OTHER", "color": "#888"}
+
+
+class OreRow:
+    """One ore of a deposit: probability and min/max/median share as fractions."""
+    __slots__ = ("name", "prob", "min_pct", "max_pct", "med_pct", "tier")
+
+    def __init__(self, name, prob, min_pct, max_pct, med_pct, tier):
+        self.name = name
+        self.prob = prob
+        self.min_pct = min_pct
+        self.max_pct = max_pct
+        self.med_pct = med_pct
+        self.tier = tier
+
+
+@functools.lru_cache(maxsize=None)
+def get_deposit_table(system: str, deposit_key: str):
+    """Ore rows of one deposit, most valuable tier first. Empty if unknown."""
+    details = ROCK_DATA.get(system.upper(), {}).get(deposit_key.upper(), {})
+    rows = [
+        OreRow(ore_name.upper(), ore.get("prob", 0), ore.get("minPct", 0), ore.get("maxPct", 0),
+               ore.get("medPct", 0), ORE_VALUE_MAP.get(ore_name.upper(), OTHER_TIER)["tier"])
+        for ore_name, ore in details.get("ores", {}).items()
+    ]
+    rows.sort(key=lambda r: TIER_RANK[r.tier])
+    return tuple(rows)
+
+
+def format_ore_row(row: OreRow) -> dict:
+    """Display strings for one ore row (render time only)."""
+    return {
+        "name": row.name.title(),
+        "prob": f"{row.prob*100:.0f}%",
+        "min": f"{row.min_pct*100:.0f}%",
+        "max": f"{row.max_pct*100:.0f}%",
+        "med": f"{row.med_pct*100:.0f}%",
+        "tier": row.tier,
+        "color": ORE_TIERS[row.tier]["color"] if row.tier in ORE_TIERS else OTHER_TIER["color"],
+    }
+
+
+def format_deposit_table(system: str, deposit_key: str):
+    return [format_ore_row(row) for row in get_deposit_table(system, deposit_key)]
+
+
+# ---------- Metrics ----------
+class Metrics:
+    """Counters and latency histograms for /metrics (Prometheus text format).
+
+    Every thread records into its own shard, so inc()/observe() take no lock and
+    cost a dict lookup plus a bisect; a scrape sums the shards. Gauges are
+    callables evaluated at scrape time.
+    """
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix="scanner"):
+        self.prefix = prefix
+        self.help = {}
+        self.gauges = {}  # name -> (help, fn returning a number)
+        self._local = local()
+        self._shards = []
+        self._lock = Lock()  # only taken when a thread records for the first time
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})  # counters, histograms
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels=(), amount=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, labels=()):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = [0] * (len(self.BUCKETS) + 1) + [0.0]  # buckets, +Inf, sum
+        hist[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        hist[-1] += seconds
+
+    def gauge(self, name, help_text, fn):
+        self.gauges[name] = (help_text, fn)
+
+    def describe(self, name, help_text):
+        self.help[name] = help_text
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+    def render(self, extra_counters=()):
+        """Prometheus exposition text; extra_counters: (name, help, labels, value) computed by the caller."""
+        with self._lock:
+            shards = list(self._shards)
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in shards:
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, hist in list(shard_histograms.items()):
+                total = histograms.setdefault(key, [0] * len(hist))
+                for i, v in enumerate(list(hist)):
+                    total[i] += v
+        for name, help_text, labels, value in extra_counters:
+            self.help.setdefault(name, help_text)
+            counters[(name, labels)] = value
+        for name in self.help:  # described counters show up as 0 before their first event
+            if name.endswith("_total") and not any(n == name for n, _ in counters):
+                counters[(name, ())] = 0
+
+        lines = []
+
+        def header(name, kind):
+            lines.append(f"# HELP {self.prefix}_{name} {self.help.get(name, name)}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for name in sorted({n for n, _ in counters}):
+            header(name, "counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{self.prefix}_{name}{self._labels(labels)} {value}")
+        for name in sorted({n for n, _ in histograms}):
+            header(name, "histogram")
+            for (n, labels), hist in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS + ("+Inf",), hist[:-1]):
+                    cumulative += count
+                    lines.append(f"{self.prefix}_{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.prefix}_{name}_sum{self._labels(labels)} {hist[-1]:.6f}")
+                lines.append(f"{self.prefix}_{name}_count{self._labels(labels)} {cumulative}")
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.append(f"{self.prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+METRICS.describe("stage_seconds", "Latency of each scan stage (capture, encode, ocr, parse, lookup, overlay)")
+METRICS.describe("ocr_errors_total", "OCR backend calls that failed")
+METRICS.describe("lookup_misses_total", "Read codes that match no deposit")
+METRICS.describe("ambiguous_codes_total", "Published codes with more than one possible deposit")
+METRICS.describe("scan_requests_total", "Single-scan requests by outcome (started, coalesced, woke, dropped)")
+METRICS.describe("editor_handler_seconds", "ROI editor time per mouse event handler and per redraw")
+METRICS.describe("editor_redraws_total", "ROI editor redraws (mouse events are coalesced to one per frame)")
+
+
+def observe_stage(stage, seconds):
+    METRICS.observe("stage_seconds", seconds, (("stage", stage),))
+
+
+# ---------- Frame Encoding ----------
+def frame_view(shot) -> np.ndarray:
+    """Wrap an mss screenshot's BGRA buffer as an (h, w, 4) array without copying."""
+    return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+
+def to_gray(frame: np.ndarray, out=None) -> np.ndarray:
+    """Greyscale of a BGR/BGRA frame, written into `out` when given; grey frames pass through."""
+    if frame.ndim == 2:
+        return frame
+    code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(frame, code, dst=out)
+
+
+class FrameEncoder:
+    """Turns captured frames into image bytes for the model, reusing its scratch buffers.
+
+    Buffers are per thread, so hotkey and continuous scans never share one.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = ENCODING if settings is None else settings
+        self._local = local()
+
+    def _buffer(self, name, shape):
+        buf = getattr(self._local, name, None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, np.uint8)
+            setattr(self._local, name, buf)
+        return buf
+
+    def prepare(self, frame: np.ndarray) -> np.ndarray:
+        """Greyscale + downscale step, done in the reusable buffers."""
+        img = frame
+        if self.settings.get("grayscale", True):
+            img = to_gray(frame, out=self._buffer("gray", frame.shape[:2]))
+        elif img.ndim == 3 and img.shape[2] == 4:
+            img = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=self._buffer("bgr", frame.shape[:2] + (3,)))
+        max_h = int(self.settings.get("max_height") or 0)
+        if max_h and img.shape[0] > max_h:
+            w = max(1, round(img.shape[1] * max_h / img.shape[0]))
+            img = cv2.resize(img, (w, max_h), dst=self._buffer("small", (max_h, w) + img.shape[2:]),
+                             interpolation=cv2.INTER_AREA)
+        return img
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        t0 = time.perf_counter()
+        img = self.prepare(frame)
+        fmt = self.settings.get("format", "png")
+        if fmt == "jpeg":
+            ok, data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, int(self.settings["jpeg_quality"])])
+        elif fmt == "raw":
+            ok, data = cv2.imencode(".bmp", img)
+        else:
+            ok, data = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, int(self.settings["png_compression"])])
+        if not ok:
+            raise ValueError(f"Could not encode frame as {fmt}")
+        observe_stage("encode", time.perf_counter() - t0)
+        return data.tobytes()
+
+
+frame_encoder = FrameEncoder()
+
+
+# ---------- ROI Preprocessing ----------
+def binarize(gray: np.ndarray) -> np.ndarray:
+    """Otsu threshold with the text always white on black."""
+    _, bw = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(bw) > bw.size // 2:  # dark text on light background
+        bw = cv2.bitwise_not(bw)
+    return bw
+
+
+def text_bbox(gray: np.ndarray, margin=2):
+    """Bounding box (x, y, w, h) around the text in the ROI, or None if nothing stands out."""
+    bw = binarize(gray)
+    # Smear glyphs horizontally so a code and its separators form one blob
+    smeared = cv2.dilate(bw, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 3)))
+    contours, _ = cv2.findContours(smeared, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = max(4, gray.size // 2000)
+    boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) >= min_area]
+    if not boxes:
+        return None
+    x0 = max(0, min(x for x, _, _, _ in boxes) - margin)
+    y0 = max(0, min(y for _, y, _, _ in boxes) - margin)
+    x1 = min(gray.shape[1], max(x + w for x, _, w, _ in boxes) + margin)
+    y1 = min(gray.shape[0], max(y + h for _, y, _, h in boxes) + margin)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def preprocess_roi(frame: np.ndarray, settings=None) -> np.ndarray:
+    """Smallest legible model input: crop to text, grey, height capped, binarised, padded.
+
+    The output is dark text on white, which vision models read most reliably.
+    """
+    settings = PREPROCESS if settings is None else settings
+    img = to_gray(frame)
+    if settings.get("crop", True):
+        box = text_bbox(img)
+        if box:
+            x, y, w, h = box
+            img = img[y:y + h, x:x + w]
+    target_h = int(settings.get("target_height") or 0)
+    if target_h and img.shape[0] > target_h:  # upscaling small text adds pixels, not detail
+        w = max(1, round(img.shape[1] * target_h / img.shape[0]))
+        img = cv2.resize(img, (w, target_h), interpolation=cv2.INTER_AREA)
+    if settings.get("binarize", True):
+        img = cv2.bitwise_not(binarize(img))
+    pad = int(settings.get("pad") or 0)
+    if pad:
+        border = 255 if settings.get("binarize", True) else int(np.median(img))
+        img = cv2.copyMakeBorder(img, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=border)
+    return img
+
+
+# ---------- Ollama Client ----------
+class OllamaEndpoint:
+    """The configured Ollama server, reached through one long-lived client.
+
+    The sync client is created once and shared by all threads (httpx pools the
+    keep-alive connections); async clients are bound to an event loop, so the
+    scan pipeline asks for its own. request()/request_async() retry connection
+    errors, timeouts and 5xx/429 answers with exponential backoff until
+    `retries` or `retry_budget_seconds` runs out, and record per-call latency.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = OLLAMA if settings is None else settings
+        self._client = None
+        self._lock = Lock()
+        self.latencies_ms = deque(maxlen=256)  # successful calls, including retries
+        self.counters = {"calls": 0, "retries": 0, "failures": 0}
+
+    def _client_kwargs(self):
+        s = self.settings
+        return {
+            "host": s["host"] or None,
+            "timeout": httpx.Timeout(float(s["read_timeout"]), connect=float(s["connect_timeout"])),
+            "limits": httpx.Limits(max_connections=int(s["max_connections"]),
+                                   max_keepalive_connections=int(s["max_connections"])),
+        }
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = ollama.Client(**self._client_kwargs())
+            return self._client
+
+    def async_client(self):
+        """A new AsyncClient for the calling event loop."""
+        return ollama.AsyncClient(**self._client_kwargs())
+
+    def is_local(self):
+        host = self.settings["host"] or os.getenv("OLLAMA_HOST", "")
+        hostname = host.split("://")[-1].rsplit(":", 1)[0].strip("[]")
+        return hostname in ("", "localhost", "127.0.0.1", "::1", "0.0.0.0")
+
+    @staticmethod
+    def _retryable(error):
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code >= 500 or error.status_code == 429
+        return isinstance(error, (ConnectionError, httpx.TransportError))
+
+    def _retry_delay(self, attempt, started, error):
+        """Seconds to wait before the next attempt, or None to give up."""
+        s = self.settings
+        delay = float(s["backoff"]) * 2 ** attempt
+        if (not self._retryable(error) or attempt >= int(s["retries"])
+                or time.perf_counter() - started + delay > float(s["retry_budget_seconds"])):
+            self.counters["failures"] += 1
+            return None
+        self.counters["retries"] += 1
+        logger.warning(f"Ollama call failed ({error}), retrying in {delay:.2f} s")
+        return delay
+
+    def _record(self, started):
+        self.counters["calls"] += 1
+        self.latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    def request(self, method, **kwargs):
+        """client.<method>(**kwargs) with retries, e.g. request("chat", model=..., messages=...)."""
+        started = time.perf_counter()
+        for attempt in itertools.count():
+            try:
+                response = getattr(self.client, method)(**kwargs)
+                self._record(started)
+                return response
+            except Exception as e:
+                delay = self._retry_delay(attempt, started, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    async def request_async(self, client, method, **kwargs):
+        """request() for an AsyncClient from async_client()."""
+        started = time.perf_counter()
+        for attempt in itertools.count():
+            try:
+                response = await getattr(client, method)(**kwargs)
+                self._record(started)
+                return response
+            except Exception as e:
+                delay = self._retry_delay(attempt, started, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        lat = sorted(self.latencies_ms)
+        pick = lambda q: round(lat[min(len(lat) - 1, int(q * len(lat)))], 1) if lat else None
+        return dict(self.counters, host=self.settings["host"] or os.getenv("OLLAMA_HOST", "default"),
+                    latency_ms_p50=pick(0.5), latency_ms_p95=pick(0.95))
+
+
+ollama_endpoint = OllamaEndpoint()
+
 
 # ---------- OCR with Ollama ----------
-def ocr_with_ollama(pil_img: Image.Image, model=OLLAMA_MODEL) -> str:
-    buf = io.BytesIO()
-    pil_img.save(buf, format="PNG")
-    img_bytes = buf.getvalue()
+def _ocr_messages(frame: np.ndarray):
+    return [{
+        "role": "user",
+        "content": OCR_PROMPT,
+        "images": [frame_encoder.encode(frame)],
+    }]
+
+
+def ocr_with_ollama(frame: np.ndarray, model=OLLAMA_MODEL) -> str:
+    model_manager.begin_call()
     try:
-        response = ollama.chat(
-            model=model,
-            messages=[{
-                "role": "user",
-                "content": "Extract the numeric code shown in this image. Only return the code, no extra words.",
-                "images": [img_bytes],
-            }],
-        )
+        response = ollama_endpoint.request("chat", model=model, messages=_ocr_messages(frame),
+                                           keep_alive=model_manager.keep_alive())
+        model_manager.end_call(response)
         return response["message"]["content"].strip()
     except Exception as e:
+        model_manager.end_call()
+        METRICS.inc("ocr_errors_total")
         logger.error(f"Ollama OCR error: {e}")
         return ""
 
 
+async def ocr_with_ollama_async(frame: np.ndarray, client, model=OLLAMA_MODEL) -> str:
+    """Same as ocr_with_ollama, through an AsyncClient from ollama_endpoint (used by the scan pipeline)."""
+    model_manager.begin_call()
+    try:
+        response = await ollama_endpoint.request_async(client, "chat", model=model,
+                                                       messages=_ocr_messages(frame),
+                                                       keep_alive=model_manager.keep_alive())
+        model_manager.end_call(response)
+        return response["message"]["content"].strip()
+    except Exception as e:
+        model_manager.end_call()
+        METRICS.inc("ocr_errors_total")
+        logger.error(f"Ollama OCR error: {e}")
+        return ""
+
+
+# ---------- Model Lifecycle ----------
+class ModelManager:
+    """Keeps OLLAMA_MODEL in VRAM only while it is useful.
+
+    - warm_up(): one tiny inference at startup so the first real scan is hot
+    - pin()/unpin(): keep_alive=-1 while continuous mode is on
+    - an idle watcher unloads the model (keep_alive=0) after idle_unload_seconds
+      without a call, handing the VRAM back to the game
+    - on_activity(): scanner hotkeys reload it in the background before the scan
+    Every OCR call passes keep_alive(), so Ollama's own timer agrees with ours.
+    """
+
+    def __init__(self, model=OLLAMA_MODEL, settings=None):
+        self.model = model
+        self.settings = MODEL_LIFECYCLE if settings is None else settings
+        self.state = "unloaded"  # unloaded | loading | loaded | unloading
+        self.pinned = False
+        self.last_used = time.monotonic()
+        self._in_flight = 0
+        self._lock = Lock()
+        self._watcher = None
+        self.metrics = {"loads": 0, "unloads": 0, "last_load_seconds": None,
+                        "last_unload_seconds": None, "load_seconds_total": 0.0,
+                        "unload_seconds_total": 0.0}
+
+    def keep_alive(self):
+        """keep_alive for the next request: forever while pinned, else the idle timeout."""
+        idle = float(self.settings["idle_unload_seconds"])
+        if self.pinned:
+            return -1
+        return idle if idle > 0 else None
+
+    def begin_call(self):
+        with self._lock:
+            self._in_flight += 1
+            self.last_used = time.monotonic()
+
+    def end_call(self, response=None):
+        with self._lock:
+            self._in_flight -= 1
+            self.last_used = time.monotonic()
+            if response is not None:
+                self._record_load(response)
+                self.state = "loaded"
+
+    def _record_load(self, response):
+        # Ollama reports how long the request spent loading the model; ~0 means it was resident
+        load_s = (response.get("load_duration") or 0) / 1e9
+        if load_s > 0.05:
+            self.metrics["loads"] += 1
+            self.metrics["last_load_seconds"] = round(load_s, 3)
+            self.metrics["load_seconds_total"] += load_s
+            logger.info(f"Model {self.model} loaded in {load_s:.2f} s")
+
+    def _load(self, reason):
+        """Load the model without a prompt (Ollama just loads it and applies keep_alive)."""
+        with self._lock:
+            if self.state in ("loading", "unloading"):
+                return
+            self.state = "loading"
+        self.begin_call()
+        response = None
+        try:
+            response = ollama_endpoint.request("generate", model=self.model, keep_alive=self.keep_alive())
+            logger.debug(f"Model {self.model} ready ({reason})")
+        except Exception as e:
+            logger.warning(f"Could not load model {self.model} ({reason}): {e}")
+        finally:
+            self.end_call(response)
+            if response is None:
+                self.state = "unloaded"
+
+    def warm_up(self):
+        """One inference on a blank ROI so the vision encoder is loaded too."""
+        self._start_watcher()
+        if not self.settings["warmup"]:
+            return
+        t0 = time.perf_counter()
+        with self._lock:
+            self.state = "loading"
+        ocr_with_ollama(np.full((32, 96, 3), 255, np.uint8), self.model)
+        if self.state == "loading":  # the call failed; the first scan will load it
+            self.state = "unloaded"
+        logger.info(f"Model warm-up finished in {time.perf_counter() - t0:.2f} s")
+
+    def unload(self):
+        with self._lock:
+            if self.state != "loaded" or self._in_flight or self.pinned:
+                return
+            self.state = "unloading"
+        t0 = time.perf_counter()
+        try:
+            ollama_endpoint.client.generate(model=self.model, keep_alive=0)
+            unload_s = time.perf_counter() - t0
+            self.metrics["unloads"] += 1
+            self.metrics["last_unload_seconds"] = round(unload_s, 3)
+            self.metrics["unload_seconds_total"] += unload_s
+            self.state = "unloaded"
+            logger.info(f"Model {self.model} unloaded after idle timeout ({unload_s:.2f} s)")
+        except Exception as e:
+            self.state = "loaded"
+            logger.warning(f"Could not unload model {self.model}: {e}")
+
+    def pin(self):
+        """Continuous mode on: load now (if needed) and keep it loaded."""
+        if not ocr_uses_ollama():
+            return
+        self.pinned = True
+        Thread(target=self._load, args=("pinned",), name="model-load", daemon=True).start()
+
+    def unpin(self):
+        self.pinned = False
+        self.last_used = time.monotonic()  # idle timeout counts from here
+
+    def on_activity(self):
+        """A scanner hotkey was pressed: reload in the background if the model was unloaded."""
+        self.last_used = time.monotonic()
+        if self.state == "unloaded" and ocr_uses_ollama():
+            Thread(target=self._load, args=("hotkey",), name="model-load", daemon=True).start()
+
+    def _start_watcher(self):
+        if self._watcher is None:
+            self._watcher = Thread(target=self._watch_idle, name="model-idle", daemon=True)
+            self._watcher.start()
+
+    def _watch_idle(self):
+        while True:
+            time.sleep(5)
+            idle = float(self.settings["idle_unload_seconds"])
+            if idle > 0 and time.monotonic() - self.last_used >= idle:
+                self.unload()
+
+    def stats(self):
+        return dict(self.metrics, state=self.state, pinned=self.pinned,
+                    idle_seconds=round(time.monotonic() - self.last_used, 1),
+                    load_seconds_total=round(self.metrics["load_seconds_total"], 3),
+                    unload_seconds_total=round(self.metrics["unload_seconds_total"], 3))
+
+
+model_manager = ModelManager()
+
+
 def extract_code_from_text(raw_text: str):
     if not raw_text:
         return None, None
@@ -393,28 +1147,752 @@ def extract_code_from_text(raw_text: str):
 
 
 # ---------- Deposit Lookup ----------
+DEFAULT_MAX_DEPOSITS = 30  # count limit for deposit types without clusterCount statistics
+DEPOSIT_COUNT_MARGIN = 4  # how far above the largest observed cluster count a code may still read
+
+
+def _cluster_count_weights(stats):
+    """Discrete triangular distribution over min..max cluster counts, peaking at the median."""
+    lo = max(1, int(stats.get("min", 1)))
+    hi = max(lo, int(stats.get("max", lo)))
+    med = min(hi, max(lo, int(round(stats.get("med", lo)))))
+    weights = {c: (c - lo + 1) / (med - lo + 1) if c <= med else (hi - c + 1) / (hi - med + 1)
+               for c in range(lo, hi + 1)}
+    total = sum(weights.values())
+    return {c: w / total for c, w in weights.items()}
+
+
+def build_code_index(rock_data, multiplier_codes=MULTIPLIER_CODES):
+    """Map every plausible code (base x count) to its candidate readings, most plausible first.
+
+    A candidate's score is the expected number of scans showing that deposit type
+    with that cluster count, summed over all systems in the rock data. Types with
+    no statistics (gems, salvage) get the rarest known type's scan count, spread
+    evenly over 1..DEFAULT_MAX_DEPOSITS.
+    """
+    known_scans = [d.get("scans", 0) for system in rock_data.values() for d in system.values()]
+    fallback_scans = min(known_scans) if known_scans else 1
+    scored = {}
+    for base_code, info in multiplier_codes.items():
+        per_count = {}
+        for system in rock_data.values():
+            details = system.get(info["key"])
+            if not details:
+                continue
+            for count, weight in _cluster_count_weights(details.get("clusterCount", {})).items():
+                per_count[count] = per_count.get(count, 0.0) + details.get("scans", 0) * weight
+        if not per_count:
+            per_count = {c: fallback_scans / DEFAULT_MAX_DEPOSITS for c in range(1, DEFAULT_MAX_DEPOSITS + 1)}
+        for count, score in per_count.items():
+            scored.setdefault(base_code * count, []).append((score, base_code, count))
+
+    index = {}
+    for code, candidates in scored.items():
+        total = sum(score for score, _, _ in candidates) or 1.0
+        ranked = [
+            {
+                "name": multiplier_codes[base_code]["display_name"],
+                "key": multiplier_codes[base_code]["key"],
+                "rarity": multiplier_codes[base_code]["rarity"],
+                "base_code": base_code,
+                "deposits": count,
+                "category": multiplier_codes[base_code].get("category", "Ore"),
+                "probability": round(score / total, 3),
+            }
+            for score, base_code, count in sorted(candidates, key=lambda c: (-c[0], c[1]))
+        ]
+        best = dict(ranked[0], ambiguous=len(ranked) > 1)
+        if best["ambiguous"]:
+            best["alternatives"] = ranked[1:]
+        index[code] = best
+    return index
+
+
+def max_plausible_deposits(rock_data):
+    """Largest cluster count a code may stand for: the biggest observed one plus a margin."""
+    observed = [int(details["clusterCount"].get("max", 0)) for system in rock_data.values()
+                for details in system.values() if details.get("clusterCount")]
+    return max([DEFAULT_MAX_DEPOSITS] + [count + DEPOSIT_COUNT_MARGIN for count in observed])
+
+
+CODE_INDEX = build_code_index(ROCK_DATA)
+MAX_DEPOSITS = max_plausible_deposits(ROCK_DATA)
+CODE_DIGITS_RE = re.compile(r"(\d+)$")
+
+
+@functools.lru_cache(maxsize=1024)
+def lookup_beyond_index(num_code):
+    """Reading for a code outside CODE_INDEX (more deposits than the statistics show).
+
+    Every base code dividing `num_code` at most MAX_DEPOSITS times is a candidate,
+    ranked by how often its type was scanned at all; the result is marked
+    extrapolated=True.
+    """
+    if num_code <= 0:
+        return None
+    candidates = []
+    for base_code, info in MULTIPLIER_CODES.items():
+        if num_code % base_code == 0 and num_code // base_code <= MAX_DEPOSITS:
+            scans = sum(system.get(info["key"], {}).get("scans", 0) for system in ROCK_DATA.values())
+            candidates.append((scans or 1, base_code))
+    if not candidates:
+        return None
+    total = sum(scans for scans, _ in candidates)
+    ranked = [
+        {
+            "name": MULTIPLIER_CODES[base_code]["display_name"],
+            "key": MULTIPLIER_CODES[base_code]["key"],
+            "rarity": MULTIPLIER_CODES[base_code]["rarity"],
+            "base_code": base_code,
+            "deposits": num_code // base_code,
+            "category": MULTIPLIER_CODES[base_code].get("category", "Ore"),
+            "probability": round(scans / total, 3),
+        }
+        for scans, base_code in sorted(candidates, key=lambda c: (-c[0], c[1]))
+    ]
+    best = dict(ranked[0], ambiguous=len(ranked) > 1, extrapolated=True)
+    if best["ambiguous"]:
+        best["alternatives"] = ranked[1:]
+    return best
+
+
 def lookup_deposit(code: str):
+    """Most plausible deposit for a code, or None if no deposit type can produce it.
+
+    If several readings are possible (e.g. 18000 = Atacamite x10 or Metal Pannals x9)
+    the result has ambiguous=True and the other readings under "alternatives".
+    Codes above the observed cluster counts fall back to lookup_beyond_index.
+    The returned dict is shared with CODE_INDEX; treat it as read-only.
+    """
     if not code:
         return None
-    try:
-        m = re.search(r"(\d+)$", code)
+    if code.isdigit():
+        num_code = int(code)
+    else:
+        m = CODE_DIGITS_RE.search(code)
         if not m:
             return None
         num_code = int(m.group(1))
-        for base_code, info in MULTIPLIER_CODES.items():
-            if num_code % base_code == 0:
-                deposits = num_code // base_code
-                return {
-                    "name": info["display_name"],
-                    "key": info["key"],
-                    "rarity": info["rarity"],
-                    "base_code": base_code,
-                    "deposits": deposits,
-                    "category": info.get("category", "Ore")
-                }
-    except ValueError:
-        pass
-    return None
+    return CODE_INDEX.get(num_code) or lookup_beyond_index(num_code)
+
+
+# ---------- Capture Engine ----------
+# region: roi_layout() at grab time; image: BGRA view of the "code" ROI;
+# views: name -> BGRA view of every ROI, all slices of the same bounding-box grab
+CapturedFrame = namedtuple("CapturedFrame", "ts region image grab_ms views")
+
+
+def roi_layout():
+    """Hashable snapshot of ROIS: ((name, left, top, width, height), ...)."""
+    return tuple((r["name"], int(r["left"]), int(r["top"]), int(r["width"]), int(r["height"])) for r in ROIS)
+
+
+def roi_bbox(layout):
+    """Smallest rectangle covering every ROI in `layout`, as an mss region."""
+    left = min(l for _, l, _, _, _ in layout)
+    top = min(t for _, _, t, _, _ in layout)
+    right = max(l + w for _, l, _, w, _ in layout)
+    bottom = max(t + h for _, _, t, _, h in layout)
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
+def slice_rois(image, layout, bbox):
+    """NumPy views of each ROI inside the bounding-box grab (no copies)."""
+    return {name: image[t - bbox["top"]:t - bbox["top"] + h, l - bbox["left"]:l - bbox["left"] + w]
+            for name, l, t, w, h in layout}
+
+
+class CaptureEngine:
+    """Owns a single mss handle on its own thread and keeps the newest ROI grabs.
+
+    mss handles are tied to the thread that opened them (and to one X11 display
+    connection on Linux), so every grab in the app goes through this thread.
+    """
+
+    def __init__(self, fps=10, buffer_size=8):
+        self.fps = fps
+        self.monitors = []
+        self.frames_grabbed = 0
+        self.grab_ms = 0.0  # exponential moving average
+        self._frames = deque(maxlen=buffer_size)
+        self._cond = Condition()
+        self._wake = Event()
+        self._stop = Event()
+        self._ready = Event()
+        self._thread = None
+
+    def configure(self, fps=None, buffer_size=None):
+        if fps is not None:
+            self.fps = fps
+        if buffer_size is not None and buffer_size != self._frames.maxlen:
+            with self._cond:
+                self._frames = deque(self._frames, maxlen=max(1, int(buffer_size)))
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, timeout=5.0):
+        """Start the grab thread (no-op if running) and wait until monitors are known."""
+        if self.running():
+            return
+        self._stop.clear()
+        self._ready.clear()
+        self._thread = Thread(target=self._run, name="capture-engine", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        try:
+            with mss.mss() as sct:
+                self.monitors = [dict(m) for m in sct.monitors]
+                self._ready.set()
+                while not self._stop.is_set():
+                    layout = roi_layout()
+                    bbox = roi_bbox(layout)
+                    t0 = time.perf_counter()
+                    shot = sct.grab(bbox)  # one grab for all ROIs
+                    grab_ms = (time.perf_counter() - t0) * 1000
+                    observe_stage("capture", grab_ms / 1000)
+                    self.grab_ms = grab_ms if not self.frames_grabbed else 0.9 * self.grab_ms + 0.1 * grab_ms
+                    views = slice_rois(frame_view(shot), layout, bbox)
+                    with self._cond:
+                        self._frames.append(CapturedFrame(time.time(), layout, views["code"], grab_ms, views))
+                        self.frames_grabbed += 1
+                        self._cond.notify_all()
+                    interval = 1.0 / max(0.1, float(self.fps))
+                    self._wake.wait(max(0.0, interval - (time.perf_counter() - t0)))
+                    self._wake.clear()
+        except Exception as e:
+            logger.error(f"Capture engine stopped: {e}")
+        finally:
+            self._ready.set()
+
+    def get_frame(self, max_age=0.25, timeout=1.0):
+        """Newest frame of the current ROIS, waiting for a fresh grab if needed."""
+        self.start()
+        wanted = roi_layout()
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                frame = self._frames[-1] if self._frames else None
+                fresh = frame is not None and frame.region == wanted
+                if fresh and time.time() - frame.ts <= max_age:
+                    return frame
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.running():
+                    return frame if fresh else None
+                self._wake.set()  # grab now instead of waiting for the next tick
+                self._cond.wait(remaining)
+
+    def stats(self):
+        with self._cond:
+            frames = list(self._frames)
+        span = frames[-1].ts - frames[0].ts if len(frames) > 1 else 0.0
+        return {"running": self.running(), "fps_target": self.fps,
+                "fps": round((len(frames) - 1) / span, 2) if span > 0 else 0.0,
+                "grab_ms": round(self.grab_ms, 3), "frames": self.frames_grabbed}
+
+
+capture_engine = CaptureEngine(CAPTURE["fps"], CAPTURE["buffer_size"])
+
+
+# ---------- Frame Change Detection ----------
+SCAN_STATS = {"scans": 0, "ocr_calls": 0, "local_ocr_hits": 0, "skipped_unchanged": 0,
+              "ocr_seconds_saved": 0.0, "px_captured": 0, "px_sent": 0,
+              "ocr_ms_raw": 0.0, "ocr_ms_preprocessed": 0.0}
+_last_signature = None
+_last_ocr_seconds = 0.0
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Downscaled greyscale thumbnail of the ROI, cheap to compare between scans."""
+    return cv2.resize(to_gray(frame), (32, 12), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def frame_changed(signature: np.ndarray, reference) -> bool:
+    """True if the ROI differs meaningfully from `reference` (the last OCR'd frame).
+
+    Counts thumbnail cells that changed by more than pixel_threshold grey levels:
+    one changed digit moves a few cells a lot but the mean over the ROI very
+    little, while capture noise moves every cell a little.
+    """
+    if reference is None or reference.shape != signature.shape:
+        return True
+    changed = int(np.count_nonzero(np.abs(signature - reference) > int(CHANGE_DETECTION["pixel_threshold"])))
+    return changed >= int(CHANGE_DETECTION["min_changed_cells"])
+
+
+# ---------- OCR Result Cache ----------
+def frame_fingerprint(frame: np.ndarray) -> str:
+    """Content hash of the ROI, normalised so tiny colour/scale noise maps to the same key."""
+    small = cv2.resize(to_gray(frame), (64, 22), interpolation=cv2.INTER_AREA)
+    _, bw = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return hashlib.blake2b(np.packbits(bw > 0).tobytes(), digest_size=12).hexdigest()
+
+
+def ocr_cache_namespace(model=OLLAMA_MODEL, prompt=OCR_PROMPT) -> str:
+    """Cache keys are prefixed with this, so changing model or prompt invalidates old entries."""
+    return hashlib.blake2b(f"{model}\n{prompt}".encode("utf-8"), digest_size=6).hexdigest()
+
+
+class Autosave:
+    """Periodic background save() for state kept on disk, so a crash loses little.
+
+    Subclasses set `_closed` (Event) and `_saver` (None) and implement a save()
+    that is cheap while nothing changed.
+    """
+
+    def start_autosave(self, interval, name="autosave"):
+        """Save from a background thread every `interval` seconds."""
+        if self._saver is None and interval > 0:
+            self._saver = Thread(target=self._autosave, args=(interval,), name=name, daemon=True)
+            self._saver.start()
+
+    def _autosave(self, interval):
+        while not self._closed.wait(interval):
+            self.save()
+
+    def close(self):
+        self._closed.set()
+        if self._saver is not None:
+            self._saver.join()  # never two save() calls writing the same temp file
+        self.save()
+
+
+class OCRResultCache(Autosave):
+    """LRU + TTL cache of OCR answers (raw_text/code) that survives restarts."""
+
+    def __init__(self, path, max_entries=1024, ttl_seconds=7 * 24 * 3600, namespace=""):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> {"raw_text", "code", "ts"}
+        self._lock = Lock()
+        self._dirty = False
+        self._closed = Event()
+        self._saver = None
+
+    def _key(self, fingerprint):
+        return f"{self.namespace}:{fingerprint}"
+
+    def get(self, fingerprint):
+        key = self._key(fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["ts"] > self.ttl_seconds:
+                del self._entries[key]
+                self.evictions += 1
+                self._dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, fingerprint, raw_text, code):
+        key = self._key(fingerprint)
+        with self._lock:
+            self._entries[key] = {"raw_text": raw_text, "code": code, "ts": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._dirty = True
+
+    def load(self):
+        """Load entries from disk, dropping expired ones and those from another model/prompt."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"OCR cache file invalid, starting empty: {e}")
+            return
+        now = time.time()
+        prefix = f"{self.namespace}:"
+        stale = 0
+        with self._lock:
+            for key, entry in data.get("entries", []):
+                if not key.startswith(prefix) or now - entry.get("ts", 0) > self.ttl_seconds:
+                    stale += 1
+                    continue
+                self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"OCR cache loaded: {len(self._entries)} entries ({stale} stale dropped)")
+
+    def save(self):
+        """Write the cache atomically; no-op if nothing changed since the last save."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"namespace": self.namespace, "entries": list(self._entries.items())}
+            self._dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save OCR cache: {e}")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+ocr_cache = None
+
+
+def init_ocr_cache():
+    """(Re)create the OCR cache from the current config and load it from disk."""
+    global ocr_cache
+    if ocr_cache:
+        ocr_cache.close()
+    if not OCR_CACHE.get("enabled", True):
+        ocr_cache = None
+        return
+    ocr_cache = OCRResultCache(
+        OCR_CACHE_FILE,
+        max_entries=int(OCR_CACHE["max_entries"]),
+        ttl_seconds=float(OCR_CACHE["ttl_seconds"]),
+        namespace=ocr_cache_namespace(OLLAMA_MODEL, OCR_PROMPT),
+    )
+    ocr_cache.load()
+    ocr_cache.start_autosave(float(OCR_CACHE["save_interval"]), "ocr-cache-save")
+
+
+def save_ocr_cache():
+    if ocr_cache:
+        ocr_cache.save()
+
+
+atexit.register(save_ocr_cache)
+
+
+# ---------- Local Digit Recognizer ----------
+GLYPH_W, GLYPH_H = 12, 18
+
+
+def segment_glyphs(frame: np.ndarray):
+    """Binarise the ROI and cut it into digit glyphs, left to right.
+
+    Returns a (n, GLYPH_W*GLYPH_H) float32 array. Separators ('.' / ',') and specks
+    are dropped by height, so '9.600' and '9600' both give four glyphs.
+    """
+    bw = binarize(to_gray(frame))
+    n, _, stats, _ = cv2.connectedComponentsWithStats(bw, connectivity=8)
+    boxes = [tuple(stats[i, :4]) for i in range(1, n) if stats[i, cv2.CC_STAT_AREA] >= 3]
+    if not boxes:
+        return np.empty((0, GLYPH_W * GLYPH_H), np.float32)
+    max_h = max(h for _, _, _, h in boxes)
+    boxes = sorted(b for b in boxes if b[3] >= 0.6 * max_h)
+    glyphs = np.empty((len(boxes), GLYPH_W * GLYPH_H), np.float32)
+    for i, (x, y, w, h) in enumerate(boxes):
+        glyph = cv2.resize(bw[y:y + h, x:x + w], (GLYPH_W, GLYPH_H), interpolation=cv2.INTER_AREA)
+        glyphs[i] = glyph.reshape(-1) / 255.0
+    return glyphs
+
+
+class DigitRecognizer(Autosave):
+    """k-NN digit reader over glyphs learned from earlier vision-model scans."""
+
+    def __init__(self, path, max_samples_per_digit=40, k=3):
+        self.path = path
+        self.max_samples_per_digit = max_samples_per_digit
+        self.k = k
+        self._samples = {d: [] for d in "0123456789"}
+        self._matrix = None  # stacked samples, rebuilt lazily after learning
+        self._labels = None
+        self._lock = Lock()
+        self._dirty = False
+        self._closed = Event()
+        self._saver = None
+
+    def known_digits(self):
+        return "".join(d for d, s in self._samples.items() if s)
+
+    def learn(self, frame, code):
+        """Store the glyphs of a frame whose code was confirmed by the model."""
+        if not code or not code.isdigit():
+            return False
+        glyphs = segment_glyphs(frame)
+        if len(glyphs) != len(code):
+            return False
+        with self._lock:
+            for glyph, digit in zip(glyphs, code):
+                samples = self._samples[digit]
+                samples.append(glyph)
+                del samples[:-self.max_samples_per_digit]
+            self._matrix = None
+            self._dirty = True
+        return True
+
+    def _index(self):
+        with self._lock:
+            if self._matrix is None:
+                labels = [d for d, samples in self._samples.items() for _ in samples]
+                rows = [g for samples in self._samples.values() for g in samples]
+                self._matrix = np.array(rows, np.float32).reshape(-1, GLYPH_W * GLYPH_H)
+                self._labels = np.array(labels)
+            return self._matrix, self._labels
+
+    def recognize(self, frame):
+        """Return (code, confidence). Confidence is that of the weakest glyph."""
+        matrix, labels = self._index()
+        if len(matrix) == 0:
+            return None, 0.0
+        glyphs = segment_glyphs(frame)
+        if not 2 <= len(glyphs) <= 10:
+            return None, 0.0
+        # Mean absolute pixel difference between every glyph and every sample
+        dists = np.abs(glyphs[:, None, :] - matrix[None, :, :]).mean(axis=2)
+        k = min(self.k, len(matrix))
+        nearest = np.argsort(dists, axis=1)[:, :k]
+        digits = []
+        confidence = 1.0
+        for row, idx in enumerate(nearest):
+            votes = labels[idx]
+            best = max(set(votes), key=list(votes).count)
+            agree = float(np.mean(votes == best))
+            closeness = max(0.0, 1.0 - float(dists[row, idx[0]]) / 0.25)
+            confidence = min(confidence, agree * closeness)
+            digits.append(best)
+        return "".join(digits), round(confidence, 3)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                for digit in self._samples:
+                    if digit in data.files:
+                        self._samples[digit] = list(data[digit])[-self.max_samples_per_digit:]
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile) as e:
+            logger.warning(f"Glyph file invalid, starting empty: {e}")
+            return
+        self._matrix = None
+        logger.info(f"Digit glyphs loaded for: {self.known_digits() or '-'}")
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            arrays = {d: np.array(s, np.float32) for d, s in self._samples.items() if s}
+            self._dirty = False
+        tmp_path = self.path + ".tmp"
+        try:
+            # Atomically, like OCRResultCache: a crash mid-write must not leave a broken file
+            with open(tmp_path, "wb") as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save digit glyphs: {e}")
+
+
+digit_recognizer = None
+
+
+def init_digit_recognizer(autosave=True):
+    """(Re)create the local recognizer from the current config and load learned glyphs.
+
+    Replay workers pass autosave=False: they only read glyphs, the parent learns.
+    """
+    global digit_recognizer
+    if digit_recognizer:
+        digit_recognizer.close()
+    if not LOCAL_OCR.get("enabled", True):
+        digit_recognizer = None
+        return
+    digit_recognizer = DigitRecognizer(GLYPH_FILE, int(LOCAL_OCR["max_samples_per_digit"]))
+    digit_recognizer.load()
+    if autosave:
+        digit_recognizer.start_autosave(float(LOCAL_OCR["save_interval"]), "glyphs-save")
+
+
+def save_digit_recognizer():
+    if digit_recognizer:
+        digit_recognizer.save()
+
+
+atexit.register(save_digit_recognizer)
+
+
+# ---------- OCR Backends ----------
+# The scan stages hand the (preprocessed) ROI to `ocr_backend`; engines register
+# under a name and config.json picks one with OCR_BACKEND["name"]. Callers also
+# pass the raw greyscale ROI (`gray`, what the local digit reader learned from)
+# and whether that reader already tried this frame (`local_tried`).
+OCRAnswer = namedtuple("OCRAnswer", "text backend")
+OCR_BACKENDS = {}
+
+
+async def run_in_thread(fn, *args):
+    """asyncio.to_thread, which only exists from Python 3.9 (we support 3.8)."""
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(fn, *args))
+
+
+def register_ocr_backend(cls):
+    OCR_BACKENDS[cls.name] = cls
+    return cls
+
+
+class OCRBackend:
+    """Reads the text in an ROI image. Subclasses implement read()."""
+    name = None
+    # Answers good enough to cache and to teach the local digit reader
+    authoritative = False
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def read(self, frame, gray=None, local_tried=False) -> OCRAnswer:
+        raise NotImplementedError
+
+    async def read_async(self, frame, gray=None, local_tried=False) -> OCRAnswer:
+        return await run_in_thread(self.read, frame, gray, local_tried)
+
+    def engines(self):
+        """Names of the engines this backend may call."""
+        return [self.name]
+
+
+@register_ocr_backend
+class OllamaBackend(OCRBackend):
+    """The vision model (OLLAMA_MODEL) through ollama_endpoint."""
+    name = "ollama"
+    authoritative = True
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self._async_client = None
+        self._loop = None
+
+    def read(self, frame, gray=None, local_tried=False):
+        return OCRAnswer(ocr_with_ollama(frame), self.name)
+
+    async def read_async(self, frame, gray=None, local_tried=False):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # AsyncClients are bound to the loop that created them
+            self._async_client, self._loop = ollama_endpoint.async_client(), loop
+        return OCRAnswer(await ocr_with_ollama_async(frame, self._async_client), self.name)
+
+
+@register_ocr_backend
+class OpenCVBackend(OCRBackend):
+    """The local k-NN digit reader; answers only above LOCAL_OCR["min_confidence"].
+
+    Reads the raw greyscale ROI its glyphs were learned from, not the model
+    input, and stays silent if the scan path already asked it (local_tried).
+    """
+    name = "opencv"
+
+    def read(self, frame, gray=None, local_tried=False):
+        if digit_recognizer is None or local_tried:
+            return OCRAnswer("", self.name)
+        code, confidence = digit_recognizer.recognize(to_gray(frame) if gray is None else gray)
+        return OCRAnswer(code if code and confidence >= LOCAL_OCR["min_confidence"] else "", self.name)
+
+
+@register_ocr_backend
+class MockBackend(OCRBackend):
+    """Replays mock_answers in order (wrapping around) after mock_latency_ms.
+
+    Deterministic, so benchmarks and tests can run the whole pipeline without a
+    GPU or a model server.
+    """
+    name = "mock"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self._answers = itertools.cycle(list(settings["mock_answers"]) or [""])
+        self._lock = Lock()
+
+    def _next(self):
+        with self._lock:
+            return OCRAnswer(next(self._answers), self.name)
+
+    def read(self, frame, gray=None, local_tried=False):
+        time.sleep(float(self.settings["mock_latency_ms"]) / 1000)
+        return self._next()
+
+    async def read_async(self, frame, gray=None, local_tried=False):
+        await asyncio.sleep(float(self.settings["mock_latency_ms"]) / 1000)
+        return self._next()
+
+
+@register_ocr_backend
+class CascadeBackend(OCRBackend):
+    """Tries the engines in settings["cascade"] in order and stops at the first
+    answer that contains a known deposit code; otherwise returns the last
+    non-empty answer."""
+    name = "cascade"
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.stages = []
+        for name in settings["cascade"]:
+            if name not in OCR_BACKENDS or name == self.name:
+                logger.warning(f"Unknown cascade stage {name!r} skipped (known: {', '.join(OCR_BACKENDS)})")
+                continue
+            self.stages.append(OCR_BACKENDS[name](settings))
+
+    @staticmethod
+    def _accept(answer):
+        return bool(answer.text) and lookup_deposit(extract_code_from_text(answer.text)[0]) is not None
+
+    def read(self, frame, gray=None, local_tried=False):
+        best = OCRAnswer("", self.name)
+        for stage in self.stages:
+            answer = stage.read(frame, gray, local_tried)
+            if self._accept(answer):
+                return answer
+            best = answer if answer.text else best
+        return best
+
+    async def read_async(self, frame, gray=None, local_tried=False):
+        best = OCRAnswer("", self.name)
+        for stage in self.stages:
+            answer = await stage.read_async(frame, gray, local_tried)
+            if self._accept(answer):
+                return answer
+            best = answer if answer.text else best
+        return best
+
+    def engines(self):
+        return [name for stage in self.stages for name in stage.engines()]
+
+
+ocr_backend = None
+
+
+def init_ocr_backend():
+    """(Re)create the configured OCR backend."""
+    global ocr_backend
+    name = OCR_BACKEND["name"]
+    if name not in OCR_BACKENDS:
+        logger.warning(f"Unknown OCR backend {name!r}, using ollama (known: {', '.join(OCR_BACKENDS)})")
+        name = "ollama"
+    ocr_backend = OCR_BACKENDS[name](OCR_BACKEND)
+    logger.info(f"OCR backend: {name} ({', '.join(ocr_backend.engines())})")
+
+
+def ocr_uses_ollama():
+    return ocr_backend is None or "ollama" in ocr_backend.engines()
 
 
 # ---------- Capture / Overlay ----------
@@ -424,8 +1902,9 @@ border_canvas = None
 overlay_canvas = None
 overlay_text_id = None
 overlay_text = ""
-last_overlay_time = 0
 root_overlay = None
+LABEL_TIMEOUT_MS = 10000  # clear the overlay label after this long without an update
+FRAME_MS = 16  # Tk redraws from bursts of updates/mouse events happen at most once per frame (~60 Hz)
 
 
 def toggle_border():
@@ -436,24 +1915,77 @@ def toggle_border():
         border_canvas.itemconfig("border", state="normal" if show_border else "hidden")
 
 
-def update_overlay_label(info):
-    """Update the overlay label with deposit info and reset timeout timer."""
-    global overlay_text, overlay_text_id, overlay_canvas, last_overlay_time
-    if info:
-        overlay_text = f"{info['name']} x{info['deposits']}" if "deposits" in info else info["name"]
-        last_overlay_time = time.time()
-        if overlay_canvas and overlay_text_id:
-            overlay_canvas.itemconfig(overlay_text_id, text=overlay_text, fill=label_color)
+class OverlayUpdates:
+    """Overlay label updates from scan threads, drawn by the Tk main loop.
 
+    Scan threads only drop the newest label into a one-slot mailbox; a burst of
+    updates collapses into that slot. The post that fills an empty mailbox arms
+    one after(FRAME_MS) drain (tkinter hands that call to the main loop), and
+    nothing is scheduled while the mailbox stays empty. All drawing happens in
+    the main loop. The label is cleared by a single one-shot timer that every
+    update re-arms.
+    """
 
-def start_label_timeout(root):
-    """Background loop to clear overlay label if no update for 10s."""
-    global overlay_text_id, overlay_canvas, last_overlay_time
-    if overlay_canvas and overlay_text_id:
-        if last_overlay_time and (time.time() - last_overlay_time > 10):
+    def __init__(self):
+        self.posted = 0
+        self.drawn = 0
+        self._lock = Lock()
+        self._pending = None
+        self._scheduled = False  # a drain is armed or running
+        self._widget = None
+        self._timeout_after = None
+
+    def attach(self, widget):
+        """Bind to the overlay window and draw what was posted before (main thread)."""
+        self._widget = widget
+        self._draw()
+
+    def post(self, text):
+        """Queue `text` for the overlay label. Safe to call from any thread."""
+        with self._lock:
+            self.posted += 1
+            self._pending = text
+            if self._scheduled or self._widget is None:
+                return  # attach() or the armed drain picks it up
+            self._scheduled = True
+        try:
+            self._widget.after(FRAME_MS, self._draw)
+        except (RuntimeError, tk.TclError):  # main loop not running (yet, or any more)
+            with self._lock:
+                self._scheduled = False
+
+    def _draw(self):
+        with self._lock:
+            text, self._pending = self._pending, None
+            self._scheduled = False
+        if text is None or not (overlay_canvas and overlay_text_id):
+            return
+        t0 = time.perf_counter()
+        overlay_canvas.itemconfig(overlay_text_id, text=text, fill=label_color)
+        if self._timeout_after is not None:
+            self._widget.after_cancel(self._timeout_after)
+        self._timeout_after = self._widget.after(LABEL_TIMEOUT_MS, self._clear)
+        self.drawn += 1
+        observe_stage("overlay", time.perf_counter() - t0)
+
+    def _clear(self):
+        self._timeout_after = None
+        if overlay_canvas and overlay_text_id:
             overlay_canvas.itemconfig(overlay_text_id, text="")
-            last_overlay_time = 0
-    root.after(500, lambda: start_label_timeout(root))
+
+    def stats(self):
+        return {"posted": self.posted, "drawn": self.drawn}
+
+
+overlay_updates = OverlayUpdates()
+
+
+def update_overlay_label(info):
+    """Show deposit info on the overlay and restart the label timeout. Never touches Tk itself."""
+    global overlay_text
+    if info:
+        overlay_text = f"{info['name']} x{info['deposits']}" if "deposits" in info else info["name"]
+        overlay_updates.post(overlay_text)
 
 
 
@@ -503,13 +2035,16 @@ def show_overlay():
         text="", fill=label_color, font=("Arial", 14, "bold"),
         width=overlay_width - 12, anchor="n"
     )
-    start_label_timeout(root_overlay)
+    overlay_updates.attach(root_overlay)
+
 
 
+_overlay_geometry = None  # (width, height, left, top) last applied to the overlay window
+
 
 def update_overlay_region():
 
-    global overlay_canvas, rect_id, root_overlay, overlay_text_id
+    global overlay_canvas, rect_id, root_overlay, overlay_text_id, _overlay_geometry
     if not overlay_canvas or not rect_id:
         return
     cap_w, cap_h = int(CAP_REGION['width']), int(CAP_REGION['height'])
@@ -518,6 +2053,9 @@ def update_overlay_region():
     overlay_height = cap_h + text_area_h
     left = int(CAP_REGION['left'])
     top = int(CAP_REGION['top'])
+    if (overlay_width, overlay_height, left, top) == _overlay_geometry:
+        return  # same screen rectangle: don't move/resize the window
+    _overlay_geometry = (overlay_width, overlay_height, left, top)
 
     # Resize/move window to match ROI+text area
     try:
@@ -559,33 +2097,40 @@ def _scale_screen_to_gui(left, top, width, height):
     h_gui = max(1, int(round(height * sy)))
     return x_gui, y_gui, w_gui, h_gui
 
+def read_monitor_layout():
+    """Monitor rectangles as mss numbers them (0 = all monitors); no grab, no capture thread."""
+    with mss.mss() as sct:
+        return [dict(m) for m in sct.monitors]
+
+
 def init_base_region(monitor_index=1):
     """Initialize base (16:9) region to the selected monitor's bounds."""
     global REGION_BASE_W, REGION_BASE_H, REGION_GUI_W, REGION_GUI_H, REGION_ANCHOR
     try:
-        with mss.mss() as sct:
-            mons = sct.monitors
-            if not mons or monitor_index >= len(mons):
-                mon = mons[1]
-            else:
-                mon = mons[monitor_index]
-            REGION_BASE_W = int(mon.get("width", 1920))
-            REGION_BASE_H = int(mon.get("height", 1080))
-            REGION_ANCHOR = {"left": int(mon.get("left", 0)), "top": int(mon.get("top", 0))}
-            REGION_GUI_W, REGION_GUI_H = REGION_BASE_W // 2, REGION_BASE_H // 2
+        mons = capture_engine.monitors or read_monitor_layout()
+        if not mons or monitor_index >= len(mons):
+            mon = mons[1]
+        else:
+            mon = mons[monitor_index]
+        REGION_BASE_W = int(mon.get("width", 1920))
+        REGION_BASE_H = int(mon.get("height", 1080))
+        REGION_ANCHOR = {"left": int(mon.get("left", 0)), "top": int(mon.get("top", 0))}
+        REGION_GUI_W, REGION_GUI_H = REGION_BASE_W // 2, REGION_BASE_H // 2
     except Exception:
         # Fallback
         REGION_BASE_W, REGION_BASE_H = 1920, 1080
         REGION_GUI_W, REGION_GUI_H = REGION_BASE_W // 2, REGION_BASE_H // 2
         REGION_ANCHOR = {"left": 0, "top": 0}
 
-# Initialize base region from primary monitor
-init_base_region(1)
-
 
 class ROIEditor(tk.Canvas):
-    """Canvas (16:9) with draggable & mouse-wheel scalable ROI that preserves 130:44."""
-    def __init__(self, master, *args, **kwargs):
+    """Canvas (16:9) showing every ROI in ROIS. The selected one is draggable and
+    mouse-wheel scalable; clicking another ROI selects it. The code ROI keeps
+    130:44, other ROIs keep their own aspect (Shift+wheel changes their width).
+
+    Mouse events only update the ROI numbers; the canvas items are moved (never
+    recreated) and the overlay follows at most once per frame (FRAME_MS)."""
+    def __init__(self, master, *args, on_select=None, **kwargs):
         kwargs.setdefault("width", REGION_GUI_W)
         kwargs.setdefault("height", REGION_GUI_H)
         kwargs.setdefault("bg", "#111")
@@ -594,35 +2139,67 @@ class ROIEditor(tk.Canvas):
         self._dragging = False
         self._drag_dx = 0
         self._drag_dy = 0
-        self._min_w = 40  # minimum GUI width
-
-        # Init ROI from CAP_REGION or fallback
-        try:
-            gx, gy, gw, gh = _scale_screen_to_gui(
-                int(CAP_REGION.get("left", 0)),
-                int(CAP_REGION.get("top", 0)),
-                int(CAP_REGION.get("width", 260)),
-                int(CAP_REGION.get("height", int(260 * ASPECT_H/ASPECT_W)))
-            )
-        except Exception:
-            gx, gy, gw, gh = REGION_GUI_W//4, REGION_GUI_H//4, REGION_GUI_W//3, int((REGION_GUI_W//3) * ASPECT_H/ASPECT_W)
-        gw = max(self._min_w, int(gw))
-        gh = int(round(gw * (ASPECT_H/ASPECT_W)))
-        self.roi = [gx, gy, gw, gh]
+        self._min_w = 40  # minimum GUI width of the code ROI
+        self._on_select = on_select
+        self.rois = {}  # name -> [x, y, w, h] in GUI coordinates
+        self._roi_ids = {}  # name -> (rectangle id, name label id)
+        self.selected = "code"
+        self._redraw_after = None
+        self._drag_pos = None  # latest pointer position not yet applied
+        self._drag_started = 0.0
+        self._drag_events = 0
+        self._drag_redraws = 0
 
         self._draw_static()
-        self._roi_id = self.create_rectangle(*self.roi_rect(), outline="#58a6ff", width=2)
-        self._shade_ids = self._draw_shade()
+        for entry in ROIS:
+            self._add_gui_roi(entry)
+        self._shade_ids = [self.create_rectangle(0, 0, 0, 0, fill="#000", stipple="gray25", width=0)
+                           for _ in range(4)]
+        self._draw_shade()
 
         # Events
         self.bind("<ButtonPress-1>", self._on_press)
         self.bind("<B1-Motion>", self._on_drag)
         self.bind("<ButtonRelease-1>", self._on_release)
         self.bind("<MouseWheel>", self._on_wheel)      # Windows/Mac
+        self.bind("<Shift-MouseWheel>", lambda e: self._zoom(+1 if e.delta > 0 else -1, e.x, e.y, stretch=True))
         self.bind("<Button-4>", lambda e: self._zoom(+1, e.x, e.y))  # Linux
         self.bind("<Button-5>", lambda e: self._zoom(-1, e.x, e.y))
+        self.bind("<Shift-Button-4>", lambda e: self._zoom(+1, e.x, e.y, stretch=True))
+        self.bind("<Shift-Button-5>", lambda e: self._zoom(-1, e.x, e.y, stretch=True))
 
-        self._push_to_cap_region()
+        for name in list(self.rois):
+            self.selected = name
+            self._push_to_cap_region()
+        self.select("code")
+
+    @property
+    def roi(self):
+        return self.rois[self.selected]
+
+    @roi.setter
+    def roi(self, value):
+        self.rois[self.selected] = value
+
+    def _add_gui_roi(self, entry):
+        # Init ROI from its screen coordinates or fallback
+        name = entry["name"]
+        try:
+            gx, gy, gw, gh = _scale_screen_to_gui(
+                int(entry.get("left", 0)),
+                int(entry.get("top", 0)),
+                int(entry.get("width", 260)),
+                int(entry.get("height", int(260 * ASPECT_H/ASPECT_W)))
+            )
+        except Exception:
+            gx, gy, gw, gh = REGION_GUI_W//4, REGION_GUI_H//4, REGION_GUI_W//3, int((REGION_GUI_W//3) * ASPECT_H/ASPECT_W)
+        if name == "code":
+            gw = max(self._min_w, int(gw))
+            gh = int(round(gw * (ASPECT_H/ASPECT_W)))
+        self.rois[name] = [gx, gy, max(8, int(gw)), max(4, int(gh))]
+        rect = self.create_rectangle(*self._rect(name), outline="#777", width=2)
+        label = self.create_text(gx + 2, gy - 2, anchor="sw", fill="#999", text=name)
+        self._roi_ids[name] = (rect, label)
 
     # Drawing
     def _draw_static(self):
@@ -632,10 +2209,7 @@ class ROIEditor(tk.Canvas):
         self._info_id = self.create_text(8, 28, anchor="nw", fill="#bbb", text="ROI: -")
 
     def _draw_shade(self):
-        # Shade outside ROI
-        for i in getattr(self, "_shade_ids", []):
-            try: self.delete(i)
-            except: pass
+        # Shade outside the selected ROI: move the four rectangles around it
         x, y, w, h = self.roi
         parts = [
             (0,0, REGION_GUI_W, y),
@@ -643,25 +2217,64 @@ class ROIEditor(tk.Canvas):
             (x+w,y, REGION_GUI_W, y+h),
             (0,y+h, REGION_GUI_W, REGION_GUI_H)
         ]
-        ids = []
-        for a,b,c,d in parts:
-            ids.append(self.create_rectangle(a,b,c,d, fill="#000", stipple="gray25", width=0))
-        return ids
+        for item, part in zip(self._shade_ids, parts):
+            self.coords(item, *part)
 
-    def roi_rect(self):
-        x, y, w, h = self.roi
+    def _rect(self, name):
+        x, y, w, h = self.rois[name]
         return (x, y, x+w, y+h)
 
+    def roi_rect(self):
+        return self._rect(self.selected)
+
     def _update_draw(self):
         self._clamp_in_bounds()
-        self.coords(self._roi_id, *self.roi_rect())
-        self._shade_ids = self._draw_shade()
+        rect, label = self._roi_ids[self.selected]
+        self.coords(rect, *self.roi_rect())
+        self.coords(label, self.roi[0] + 2, self.roi[1] - 2)
+        self._draw_shade()
         l,t,w,h = self._to_screen()
         try:
-            self.itemconfig(self._info_id, text=f"ROI: {w}×{h} @ {l},{t}  (130:44)")
+            aspect = "  (130:44)" if self.selected == "code" else ""
+            self.itemconfig(self._info_id, text=f"ROI {self.selected}: {w}×{h} @ {l},{t}{aspect}")
         except Exception:
             pass
 
+    # Selection
+    def select(self, name):
+        if name not in self.rois:
+            return
+        self.selected = name
+        for other, (rect, label) in self._roi_ids.items():
+            active = other == name
+            self.itemconfig(rect, outline="#58a6ff" if active else "#777")
+            self.itemconfig(label, fill="#58a6ff" if active else "#999")
+            if active:
+                self.tag_raise(rect)
+                self.tag_raise(label)
+        self._update_draw()
+        if self._on_select:
+            self._on_select(name)
+
+    def add_roi(self, name):
+        """New ROI next to the code ROI, selected for editing."""
+        l, t, w, h = (int(CAP_REGION[k]) for k in ("left", "top", "width", "height"))
+        entry = {"name": name, "left": l, "top": t + 2 * h, "width": w, "height": h}
+        ROIS.append(entry)
+        self._add_gui_roi(entry)
+        self.select(name)
+        self._push_to_cap_region()
+
+    def remove_roi(self, name):
+        if name == "code" or name not in self.rois:
+            return
+        ROIS[:] = [r for r in ROIS if r["name"] != name]
+        for item in self._roi_ids.pop(name):
+            self.delete(item)
+        del self.rois[name]
+        field_reader.forget([name])
+        self.select("code")
+
     # Logic
     def _clamp_in_bounds(self):
         x, y, w, h = self.roi
@@ -676,75 +2289,683 @@ class ROIEditor(tk.Canvas):
         return _scale_gui_to_screen(x, y, w, h)
 
     def _push_to_cap_region(self):
+        """Write the selected ROI back to its ROIS entry (CAP_REGION for "code")."""
         l,t,w,h = self._to_screen()
-        CAP_REGION["left"] = int(l)
-        CAP_REGION["top"] = int(t)
-        CAP_REGION["width"] = int(w)
-        CAP_REGION["height"] = int(h)
+        entry = next(r for r in ROIS if r["name"] == self.selected)
+        if (entry.get("left"), entry.get("top"), entry.get("width"), entry.get("height")) == (l, t, w, h):
+            return  # GUI moved less than one screen pixel
+        entry["left"] = int(l)
+        entry["top"] = int(t)
+        entry["width"] = int(w)
+        entry["height"] = int(h)
+        if self.selected != "code":
+            return
+        result_stabilizer.reset()  # earlier reads are of other pixels
         try:
             update_overlay_region()
         except Exception:
             pass
 
     # Events
+    def _hit(self, px, py):
+        """Name of the ROI under the cursor, preferring the selected one."""
+        for name in [self.selected] + [n for n in self.rois if n != self.selected]:
+            x, y, w, h = self.rois[name]
+            if x <= px <= x+w and y <= py <= y+h:
+                return name
+        return None
+
     def _on_press(self, e):
+        name = self._hit(e.x, e.y)
+        if name is None:
+            return
+        if name != self.selected:
+            self.select(name)
         x, y, w, h = self.roi
-        if x <= e.x <= x+w and y <= e.y <= y+h:
-            self._dragging = True
-            self._drag_dx = e.x - x
-            self._drag_dy = e.y - y
+        self._dragging = True
+        self._drag_dx = e.x - x
+        self._drag_dy = e.y - y
+        self._drag_started = time.perf_counter()
+        self._drag_events = self._drag_redraws = 0
 
     def _on_drag(self, e):
         if not self._dragging: return
-        w = self.roi[2]
-        h = self.roi[3]
-        x = e.x - self._drag_dx
-        y = e.y - self._drag_dy
-        self.roi = [x,y,w,h]
-        self._update_draw()
-        self._push_to_cap_region()
+        t0 = time.perf_counter()
+        self._drag_pos = (e.x, e.y)
+        self._drag_events += 1
+        self._request_redraw()
+        METRICS.observe("editor_handler_seconds", time.perf_counter() - t0, (("handler", "drag"),))
 
     def _on_release(self, e):
+        if not self._dragging: return
         self._dragging = False
+        self._redraw()  # apply the last position right away
+        seconds = time.perf_counter() - self._drag_started
+        if seconds > 0:
+            logger.debug(f"ROI drag: {self._drag_events} motion events, {self._drag_redraws} redraws in "
+                         f"{seconds:.2f} s ({self._drag_redraws / seconds:.0f} redraws/s)")
+
+    def _request_redraw(self):
+        if self._redraw_after is None:
+            self._redraw_after = self.after(FRAME_MS, self._redraw)
+
+    def _redraw(self):
+        """Apply pending mouse input once: move the canvas items and the overlay."""
+        if self._redraw_after is not None:
+            self.after_cancel(self._redraw_after)
+            self._redraw_after = None
+        t0 = time.perf_counter()
+        if self._drag_pos is not None:
+            px, py = self._drag_pos
+            self._drag_pos = None
+            self.roi = [px - self._drag_dx, py - self._drag_dy, self.roi[2], self.roi[3]]
+        self._update_draw()
+        self._push_to_cap_region()
+        self._drag_redraws += 1
+        METRICS.inc("editor_redraws_total")
+        METRICS.observe("editor_handler_seconds", time.perf_counter() - t0, (("handler", "redraw"),))
 
     def _on_wheel(self, e):
         direction = +1 if e.delta > 0 else -1
         self._zoom(direction, e.x, e.y)
 
-    def _zoom(self, direction, cx, cy):
+    def _zoom(self, direction, cx, cy, stretch=False):
+        t0 = time.perf_counter()
         x, y, w, h = self.roi
         mx = x + w/2
         my = y + h/2
         factor = 1.05 if direction > 0 else (1/1.05)
-        new_w = max(self._min_w, int(round(w * factor)))
-        new_h = int(round(new_w * (ASPECT_H/ASPECT_W)))
+        if self.selected == "code":
+            new_w = max(self._min_w, int(round(w * factor)))
+            new_h = int(round(new_w * (ASPECT_H/ASPECT_W)))
+        elif stretch:  # width only
+            new_w, new_h = max(8, int(round(w * factor))), h
+        else:
+            new_w = max(8, int(round(w * factor)))
+            new_h = max(4, int(round(new_w * h / w)))
         new_x = int(round(mx - new_w/2))
         new_y = int(round(my - new_h/2))
         self.roi = [new_x, new_y, new_w, new_h]
         self._clamp_in_bounds()
-        self._update_draw()
-        self._push_to_cap_region()
+        self._request_redraw()
+        METRICS.observe("editor_handler_seconds", time.perf_counter() - t0, (("handler", "wheel"),))
 
-def capture_once():
-    """Capture one scan from CAP_REGION and update overlay."""
-    global last_result
-    with mss.mss() as sct:
-        monitor = {
-            "left": CAP_REGION["left"],
-            "top": CAP_REGION["top"],
-            "width": CAP_REGION["width"],
-            "height": CAP_REGION["height"],
-        }
-        img = sct.grab(monitor)
-        pil_img = Image.frombytes("RGB", img.size, img.rgb)
+def record_model_input(frame, model_input, preprocess_ms, ocr_ms):
+    """Track how much preprocessing shrinks the model input and what OCR costs with/without it."""
+    px_in = frame.shape[0] * frame.shape[1]
+    px_sent = model_input.shape[0] * model_input.shape[1]
+    SCAN_STATS["px_captured"] += px_in
+    SCAN_STATS["px_sent"] += px_sent
+    key = "ocr_ms_preprocessed" if model_input is not frame else "ocr_ms_raw"
+    SCAN_STATS[key] = ocr_ms if not SCAN_STATS[key] else round(0.8 * SCAN_STATS[key] + 0.2 * ocr_ms, 1)
+    logger.debug("Model input %dx%d -> %dx%d (%.0f%% of pixels), preprocess %.1f ms, OCR %.0f ms",
+                frame.shape[1], frame.shape[0], model_input.shape[1], model_input.shape[0],
+                px_sent / px_in * 100, preprocess_ms, ocr_ms)
 
-    raw_text = ocr_with_ollama(pil_img)
-    code, raw = extract_code_from_text(raw_text)
-    info = lookup_deposit(code)
 
-    last_result = {"code": code, "code_raw": raw, "info": info, "raw_text": raw_text}
+# ---------- Result Stabilizer ----------
+ScanRead = namedtuple("ScanRead", "code code_raw raw_text")
+
+
+class ResultStabilizer:
+    """Sliding window over recent reads; a code is confirmed once enough of them agree.
+
+    Codes are compared after normalisation, so '9.600', '9600' and '9,600' agree.
+    Confidence is the agreeing share of the window, and must also reach MIN_CONFIDENCE.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = STABILIZER if settings is None else settings
+        self._reads = deque(maxlen=int(self.settings["window"]))
+        self._lock = Lock()  # reset() comes from the GUI/hotkey threads
+        self.confirmed = None  # ScanRead of the code currently confirmed
+
+    def add(self, read):
+        """Add a read; returns (confirmed ScanRead or None, confidence of the leading code)."""
+        window = int(self.settings["window"])
+        with self._lock:
+            if self._reads.maxlen != window:
+                self._reads = deque(self._reads, maxlen=window)
+            self._reads.append(read)
+            counts = Counter(r.code for r in self._reads if r.code)
+            if not counts:
+                return None, 0.0
+            code, agreeing = counts.most_common(1)[0]
+            confidence = agreeing / len(self._reads)
+            if agreeing >= int(self.settings["required"]) and confidence >= MIN_CONFIDENCE:
+                # Report the newest read of the winning code (its raw text is the freshest)
+                self.confirmed = next(r for r in reversed(self._reads) if r.code == code)
+                return self.confirmed, round(confidence, 3)
+            return None, round(confidence, 3)
+
+    def settled(self):
+        """False while the newest read shows a code the window has not confirmed yet."""
+        with self._lock:
+            last = self._reads[-1] if self._reads else None
+            return last is None or not last.code or (self.confirmed is not None and self.confirmed.code == last.code)
+
+    def reset(self):
+        """Forget earlier reads, e.g. when the ROI moved or continuous mode toggled."""
+        with self._lock:
+            self._reads.clear()
+            self.confirmed = None
+
+
+result_stabilizer = ResultStabilizer()
+
+
+# ---------- HUD Field Readouts ----------
+FIELD_VALUE_RE = re.compile(r"-?\d[\d.,]*\s*%?")
+
+
+class FieldReader:
+    """Reads the ROIs other than "code" (mass, instability, ...) from the same grab.
+
+    A field is only re-read when its pixels changed (frame_signature) and the OCR
+    cache has no answer for them; the remaining fields are read concurrently, as
+    parallel backend requests, next to the deposit code read.
+    """
+
+    def __init__(self, max_workers=4):
+        self.values = {}  # name -> {"text", "raw_text", "source", "ts"}
+        self.reads = 0
+        self._signatures = {}
+        self._lock = Lock()
+        self._pool = None
+        self._max_workers = max_workers
+
+    def _pending(self, captured):
+        """Fields whose pixels changed: (name, model_input, fingerprint, signature)."""
+        pending = []
+        for name, view in (captured.views or {}).items():
+            if name == "code":
+                continue
+            gray = to_gray(view)
+            signature = frame_signature(gray)
+            if CHANGE_DETECTION["enabled"] and not frame_changed(signature, self._signatures.get(name)):
+                continue
+            fingerprint = frame_fingerprint(gray) if ocr_cache else None
+            cached = ocr_cache.get(fingerprint) if ocr_cache else None
+            if cached is not None:
+                self._store(name, signature, cached["raw_text"], "cache")
+                continue
+            model_input = preprocess_roi(view) if PREPROCESS["enabled"] else view
+            pending.append((name, model_input, fingerprint, signature))
+        return pending
+
+    def _store(self, name, signature, raw_text, source, fingerprint=None, authoritative=False):
+        match = FIELD_VALUE_RE.search(raw_text or "")
+        with self._lock:
+            # Empty answers are retried on the next frame instead of being remembered
+            self._signatures[name] = signature if raw_text else None
+            self.values[name] = {"text": match.group(0).strip() if match else None, "raw_text": raw_text,
+                                 "source": source, "ts": time.time()}
+        if ocr_cache and raw_text and authoritative and fingerprint:
+            ocr_cache.put(fingerprint, raw_text, None)
+
+    def _finish(self, pending, answers):
+        for (name, _, fingerprint, signature), answer in zip(pending, answers):
+            self.reads += 1
+            self._store(name, signature, answer.text, answer.backend, fingerprint,
+                        OCR_BACKENDS[answer.backend].authoritative)
+        publish_fields(self.snapshot())
+
+    def start(self, captured):
+        """Begin reading changed fields on worker threads; pass the result to finish()."""
+        pending = self._pending(captured)
+        if not pending:
+            return None
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(self._max_workers, thread_name_prefix="field-ocr")
+        return pending, [self._pool.submit(ocr_backend.read, model_input) for _, model_input, _, _ in pending]
+
+    def finish(self, started):
+        if started is None:
+            publish_fields(self.snapshot())
+            return
+        pending, futures = started
+        self._finish(pending, [f.result() for f in futures])
+
+    async def read_async(self, captured, model_lock):
+        """Continuous mode: all changed fields as concurrent backend requests.
+
+        The batch holds `model_lock`, so it never overlaps the code read.
+        """
+        try:
+            pending = self._pending(captured)
+            if pending:
+                async with model_lock:
+                    answers = await asyncio.gather(*(ocr_backend.read_async(m) for _, m, _, _ in pending))
+                self._finish(pending, answers)
+        except Exception as e:
+            logger.error(f"Field read error: {e}")
+
+    def snapshot(self):
+        with self._lock:
+            return {name: value["text"] for name, value in self.values.items()}
+
+    def forget(self, names):
+        """Drop values of ROIs that no longer exist."""
+        with self._lock:
+            for name in names:
+                self.values.pop(name, None)
+                self._signatures.pop(name, None)
+
+
+field_reader = FieldReader()
+
+
+# ---------- Scan Stages ----------
+# A scan is split into stages so the one-shot path (capture_once) and the
+# continuous asyncio pipeline (ScanPipeline) share the same logic.
+class ScanJob:
+    """One captured frame on its way through gate -> recognition -> publish."""
+    __slots__ = ("frame", "gray", "signature", "fingerprint", "raw_text", "source", "captured_at", "use_cache")
+
+    def __init__(self, captured):
+        self.frame = captured.image
+        self.gray = to_gray(self.frame)
+        self.signature = frame_signature(self.gray)
+        self.fingerprint = None
+        self.raw_text = ""
+        self.source = None  # "cache", "local" or "model"
+        self.captured_at = captured.ts
+        self.use_cache = True  # False while the read is a vote the cache must not repeat
+
+
+def begin_scan(captured, reference):
+    """Start a scan, or return None (re-showing last_result) if the ROI matches `reference`."""
+    SCAN_STATS["scans"] += 1
+    job = ScanJob(captured)
+    if CHANGE_DETECTION["enabled"] and not frame_changed(job.signature, reference):
+        # Same pixels as last time: reuse last_result instead of asking the model again
+        SCAN_STATS["skipped_unchanged"] += 1
+        SCAN_STATS["ocr_seconds_saved"] += _last_ocr_seconds
+        update_overlay_label(last_result.get("info"))
+        logger.debug("ROI unchanged, skipped OCR (%d skipped so far)", SCAN_STATS["skipped_unchanged"])
+        return None
+    return job
+
+
+def resolve_without_model(job):
+    """Try the OCR cache, then the local digit reader. True if job.raw_text was filled."""
+    job.fingerprint = frame_fingerprint(job.gray) if ocr_cache else None
+    cached = ocr_cache.get(job.fingerprint) if ocr_cache and job.use_cache else None
+    if cached is not None:
+        job.raw_text, job.source = cached["raw_text"], "cache"
+        SCAN_STATS["ocr_seconds_saved"] += _last_ocr_seconds
+        return True
+    local_code, local_conf = digit_recognizer.recognize(job.gray) if digit_recognizer else (None, 0.0)
+    if local_code and local_conf >= LOCAL_OCR["min_confidence"] and lookup_deposit(local_code):
+        # Local reader is confident and the code is a valid deposit: no model call needed
+        job.raw_text, job.source = local_code, "local"
+        SCAN_STATS["local_ocr_hits"] += 1
+        SCAN_STATS["ocr_seconds_saved"] += _last_ocr_seconds
+        return True
+    return False
+
+
+def model_input_for(job):
+    return preprocess_roi(job.frame) if PREPROCESS["enabled"] else job.frame
+
+
+def finish_model_read(job, model_input, answer, preprocess_ms, ocr_seconds):
+    """Record an OCR backend answer; authoritative ones feed the cache and the local digit reader."""
+    global _last_ocr_seconds
+    raw_text = answer.text
+    job.raw_text, job.source = raw_text, "model"
+    _last_ocr_seconds = ocr_seconds
+    SCAN_STATS["ocr_calls"] += 1
+    observe_stage("ocr", ocr_seconds)
+    record_model_input(job.frame, model_input, preprocess_ms, ocr_seconds * 1000)
+    if not OCR_BACKENDS[answer.backend].authoritative:
+        return
+    model_code = extract_code_from_text(raw_text)[0]
+    if ocr_cache and raw_text:
+        ocr_cache.put(job.fingerprint, raw_text, model_code)
+    if digit_recognizer and lookup_deposit(model_code):
+        digit_recognizer.learn(job.gray, model_code)
+
+
+def publish_read(read, confidence, source, latency_ms=None):
+    """Look up a read and make it the current result (last_result + overlay + history).
+
+    source is what asked for the scan ("hotkey", "gui" or "continuous").
+    """
+    global last_result
+    t0 = time.perf_counter()
+    info = lookup_deposit(read.code)
+    observe_stage("lookup", time.perf_counter() - t0)
+    if info is None and read.code:
+        METRICS.inc("lookup_misses_total")
+    elif info is not None and info.get("ambiguous"):
+        METRICS.inc("ambiguous_codes_total")
+    last_result = {"code": read.code, "code_raw": read.code_raw, "info": info,
+                   "confidence": confidence, "raw_text": read.raw_text, "fields": field_reader.snapshot()}
     update_overlay_label(info)
-    logger.info(f"Scan result: {last_result}")
+    result_events.publish(last_result)
+    if scan_history:
+        scan_history.record(last_result, source, latency_ms)
+    logger.info("Scan result: %s", last_result, extra={"scan": last_result})
+
+
+def publish_fields(fields):
+    """Make `fields` part of the current result.
+
+    last_result is replaced, never changed in place: the logger formats it
+    later on its own thread, and readers may hold on to the old dict.
+    """
+    global last_result
+    last_result = dict(last_result, fields=fields)
+    result_events.publish(last_result)
+
+
+def publish_scan(job, source, require_consensus=False):
+    """Parse the job's text and publish it on behalf of `source` (see publish_read).
+
+    With require_consensus (continuous mode) the read only goes out once the
+    stabilizer confirms it; returns True if something was published.
+    """
+    global _last_signature
+    # Only remember frames that were actually read; errors/empty answers get retried
+    _last_signature = job.signature if job.raw_text else None
+    t0 = time.perf_counter()
+    code, raw = extract_code_from_text(job.raw_text)
+    observe_stage("parse", time.perf_counter() - t0)
+    read = ScanRead(code, raw, job.raw_text)
+    confirmed, confidence = result_stabilizer.add(read)
+    latency_ms = (time.time() - job.captured_at) * 1000  # capture to publish
+    if not require_consensus:
+        publish_read(read, confidence, source, latency_ms)
+        return True
+    if confirmed is None or confirmed.code != code:
+        logger.debug("Read %r not confirmed yet (confidence %.2f)", code, confidence)
+        return False
+    publish_read(confirmed, confidence, source, latency_ms)
+    return True
+
+
+def capture_once(source="hotkey"):
+    """Capture one scan of all ROIs and update overlay."""
+    captured = capture_engine.get_frame()
+    if captured is None:
+        logger.warning("No frame available from capture engine, scan skipped.")
+        return
+    fields = field_reader.start(captured)  # read concurrently with the code below
+    job = begin_scan(captured, _last_signature)
+    if job is not None:
+        if not resolve_without_model(job):
+            t0 = time.perf_counter()
+            model_input = model_input_for(job)
+            t1 = time.perf_counter()
+            answer = ocr_backend.read(model_input, job.gray, local_tried=digit_recognizer is not None)
+            finish_model_read(job, model_input, answer, (t1 - t0) * 1000, time.perf_counter() - t1)
+        publish_scan(job, source)
+    field_reader.finish(fields)
+
+
+# ---------- Continuous Scan Pipeline ----------
+class AdaptiveScheduler:
+    """Chooses the continuous-mode scan interval from what recent scans saw.
+
+    Changing readouts are scanned at min_interval; a static or empty ROI backs off
+    exponentially up to max_interval. The interval never drops below what keeps
+    the model busy at most duty_cycle of the time, given measured OCR latency.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = SCHEDULER if settings is None else settings
+        self.interval = float(self.settings["min_interval"])
+        self.ocr_seconds = 0.0  # moving average of model call latency
+        self._loop = None
+        self._wake_event = None
+        self._wake_pending = False
+
+    def attach(self, loop):
+        """Bind to the pipeline's event loop so other threads can wake it."""
+        self._loop = loop
+        self._wake_event = asyncio.Event()
+
+    def on_change(self):
+        self.interval = float(self.settings["min_interval"])
+
+    def on_idle(self):
+        """ROI static, or nothing readable in it."""
+        self.interval = min(float(self.settings["max_interval"]), self.interval * float(self.settings["backoff"]))
+
+    def on_confirmed(self):
+        """The readout is confirmed; only a changed ROI needs a fast rescan."""
+        self.interval = float(self.settings["max_interval"])
+
+    def on_ocr(self, seconds):
+        self.ocr_seconds = seconds if not self.ocr_seconds else 0.8 * self.ocr_seconds + 0.2 * seconds
+
+    def next_interval(self):
+        duty = min(1.0, max(0.05, float(self.settings["duty_cycle"])))
+        duty_floor = self.ocr_seconds * (1 - duty) / duty
+        return min(float(self.settings["max_interval"]), max(self.interval, duty_floor))
+
+    def wake(self):
+        """Scan now (hotkey). Safe to call from any thread; False if a wake-up was already pending."""
+        self.on_change()
+        if self._wake_pending or not self._loop:
+            return False
+        self._wake_pending = True
+        self._loop.call_soon_threadsafe(self._wake_event.set)
+        return True
+
+    async def sleep(self, elapsed=0.0):
+        """Wait out the current interval, returning early if woken."""
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), max(0.0, self.next_interval() - elapsed))
+        except asyncio.TimeoutError:
+            pass
+        self._wake_event.clear()
+        self._wake_pending = False
+
+
+scan_scheduler = AdaptiveScheduler()
+
+
+class ScanPipeline:
+    """The one scan worker: continuous mode and single scans on one background thread.
+
+    Continuous mode runs capture -> OCR -> publish as asyncio stages joined by
+    one-slot queues. If OCR falls behind, the waiting frame is replaced by the
+    newer one (latest frame wins), so the model always reads the freshest ROI
+    while the next frame is already captured. The thread is started once and
+    idles while continuous mode is off, so quick on/off toggles never leave two
+    loops running.
+
+    Single scans (hotkey 7, GUI button) go through request_scan(), which never
+    blocks the caller: requests arriving while a scan is in flight share its
+    result (coalesced). Single scans, the OCR stage and the HUD field batches
+    take the same lock, so their model calls never overlap one another; only
+    a single scan sends its field reads alongside its own code read
+    (FieldReader.start).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.frames_dropped = 0
+        self._thread = None
+        self._loop = None
+        self._enabled_event = None
+        self._reference = None  # signature of the last frame handed to OCR
+        self._fields_task = None
+        self._queues = ()
+        self._model_lock = None  # asyncio.Lock: one model read at a time
+        self._request_lock = Lock()
+        self._inflight = None  # concurrent.futures.Future of the running single scan
+        self.requests = Counter()  # started / coalesced / woke / dropped
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            ready = Event()
+            self._thread = Thread(target=lambda: asyncio.run(self._main(ready)), name="scan-pipeline", daemon=True)
+            self._thread.start()
+            ready.wait(2.0)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._ensure_thread()
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._apply_enabled)
+
+    def _count_request(self, outcome):
+        self.requests[outcome] += 1
+        METRICS.inc("scan_requests_total", (("outcome", outcome),))
+
+    def request_scan(self, source="hotkey"):
+        """Ask for one scan from any thread without blocking.
+
+        Returns a concurrent.futures.Future that resolves once the scan is done
+        (shared by coalesced callers), or None if the request was folded into
+        continuous mode or dropped.
+        """
+        if self.enabled:
+            # Continuous mode already scans; just pull the next capture forward
+            self._count_request("woke" if scan_scheduler.wake() else "coalesced")
+            return None
+        with self._request_lock:
+            if self.scan_in_flight():
+                self._count_request("coalesced")
+                return self._inflight
+            self._ensure_thread()
+            if self._loop is None or not self._loop.is_running():
+                self._count_request("dropped")
+                logger.warning("Scan worker not running, scan request dropped.")
+                return None
+            self._count_request("started")
+            self._inflight = asyncio.run_coroutine_threadsafe(self._single_scan(source), self._loop)
+            self._inflight.add_done_callback(self._single_scan_done)
+            return self._inflight
+
+    def scan_in_flight(self):
+        inflight = self._inflight
+        return inflight is not None and not inflight.done()
+
+    async def _single_scan(self, source):
+        async with self._model_lock:
+            await run_in_thread(capture_once, source)
+
+    @staticmethod
+    def _single_scan_done(future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"Scan error: {future.exception()}")
+
+    def _apply_enabled(self):
+        if self.enabled:
+            self._enabled_event.set()
+        else:
+            self._enabled_event.clear()
+
+    def _put_latest(self, queue, item):
+        if queue.full():
+            queue.get_nowait()
+            self.frames_dropped += 1
+        queue.put_nowait(item)
+
+    async def _main(self, ready):
+        self._loop = asyncio.get_running_loop()
+        self._enabled_event = asyncio.Event()
+        self._model_lock = asyncio.Lock()
+        self._apply_enabled()
+        scan_scheduler.attach(self._loop)
+        ready.set()
+        ocr_queue = asyncio.Queue(maxsize=1)
+        publish_queue = asyncio.Queue(maxsize=1)
+        self._queues = (ocr_queue, publish_queue)
+        await asyncio.gather(
+            self._capture_stage(ocr_queue),
+            self._ocr_stage(ocr_queue, publish_queue),
+            self._publish_stage(publish_queue),
+        )
+
+    def _gate(self, captured):
+        """ScanJob for `captured`, or None if the change gate skipped it.
+
+        Skipped frames never vote. While a code still awaits confirmation, every
+        capture is read again past the gate and the OCR cache, so the stabilizer
+        only counts reads of frames of their own.
+        """
+        settled = result_stabilizer.settled()
+        job = begin_scan(captured, self._reference if settled else None)
+        if job is not None:
+            job.use_cache = settled
+        return job
+
+    async def _capture_stage(self, out_queue):
+        while True:
+            await self._enabled_event.wait()
+            started = self._loop.time()
+            try:
+                captured = await run_in_thread(capture_engine.get_frame)
+                if captured is not None and (self._fields_task is None or self._fields_task.done()):
+                    # HUD fields are read next to the code, one batch at a time
+                    self._fields_task = asyncio.create_task(field_reader.read_async(captured, self._model_lock))
+                job = self._gate(captured) if captured is not None else None
+                if job is not None:
+                    self._reference = job.signature
+                    scan_scheduler.on_change()
+                    self._put_latest(out_queue, job)
+                elif captured is not None:
+                    scan_scheduler.on_idle()  # the confirmed result stays as it is
+            except Exception as e:
+                logger.error(f"Capture stage error: {e}")
+            await scan_scheduler.sleep(self._loop.time() - started)
+
+    async def _ocr_stage(self, in_queue, out_queue):
+        while True:
+            job = await in_queue.get()
+            try:
+                if not resolve_without_model(job):
+                    t0 = time.perf_counter()
+                    model_input = model_input_for(job)
+                    async with self._model_lock:  # never overlaps a single scan's model call
+                        t1 = time.perf_counter()
+                        answer = await ocr_backend.read_async(model_input, job.gray,
+                                                              local_tried=digit_recognizer is not None)
+                    finish_model_read(job, model_input, answer, (t1 - t0) * 1000, time.perf_counter() - t1)
+                    scan_scheduler.on_ocr(_last_ocr_seconds)
+                    if not answer.text:
+                        self._reference = None  # let the capture stage retry this view
+                self._put_latest(out_queue, job)
+            except Exception as e:
+                logger.error(f"OCR stage error: {e}")
+
+    async def _publish_stage(self, in_queue):
+        while True:
+            job = await in_queue.get()
+            try:
+                if publish_scan(job, "continuous", require_consensus=True) and last_result["code"]:
+                    scan_scheduler.on_confirmed()  # value is settled, stop re-scanning quickly
+                elif not extract_code_from_text(job.raw_text)[0]:
+                    scan_scheduler.on_idle()
+            except Exception as e:
+                logger.error(f"Publish stage error: {e}")
+
+    def queue_depth(self):
+        return sum(q.qsize() for q in self._queues)
+
+    def stats(self):
+        return {"enabled": self.enabled, "frames_dropped": self.frames_dropped,
+                "queue_depth": self.queue_depth(), "requests": dict(self.requests),
+                "scan_interval": round(scan_scheduler.next_interval(), 3)}
+
+
+scan_pipeline = ScanPipeline()
+METRICS.gauge("queue_depth", "Jobs waiting between continuous-mode pipeline stages", scan_pipeline.queue_depth)
+METRICS.gauge("scan_interval_seconds", "Current continuous-mode scan interval", scan_scheduler.next_interval)
+METRICS.gauge("continuous_mode", "1 while continuous scanning is on", lambda: scan_pipeline.enabled)
+METRICS.gauge("model_loaded", "1 while the vision model is loaded", lambda: model_manager.state == "loaded")
+METRICS.gauge("capture_fps", "Measured capture engine frame rate", lambda: capture_engine.stats()["fps"])
+
+
+def request_scan(source="hotkey"):
+    """Single-scan hotkey/button: hands the scan to the scan worker and returns immediately."""
+    scan_pipeline.request_scan(source)
 
 
 def toggle_continuous():
@@ -752,76 +2973,422 @@ def toggle_continuous():
     global continuous_mode
     continuous_mode = not continuous_mode
     logger.info(f"Continuous mode: {continuous_mode}")
+    result_stabilizer.reset()  # reads from the last run must not confirm the next one
+    scan_pipeline.set_enabled(continuous_mode)
     if continuous_mode:
-        Thread(target=continuous_scan_loop, daemon=True).start()
+        model_manager.pin()
+    else:
+        model_manager.unpin()
 
 
-def continuous_scan_loop():
-    """Run scans repeatedly until continuous_mode is turned off."""
-    while continuous_mode:
-        capture_once()
-        time.sleep(2)  # adjust scan interval
 
+# ---------- Result Events ----------
+class ResultEvents:
+    """Published results as numbered, pre-serialised events for /events (SSE).
 
+    publish() drops results that repeat the previous one, serialises the compact
+    event once and wakes the waiting clients, so the scan path pays the same
+    small cost however many clients are connected. The last `history` events are
+    kept, so a client that reconnects with Last-Event-ID gets what it missed.
+    """
 
-# ---------- Flask / Hotkeys ----------
-template_folder = resource_path("templates")
-app = Flask(__name__, template_folder=template_folder)
+    def __init__(self, history=256):
+        self.seq = 0
+        self.clients = 0
+        self._events = deque(maxlen=history)  # (seq, json)
+        self._last_key = None
+        self._cond = Condition()
+
+    def publish(self, result):
+        info = result.get("info") or {}
+        event = {"code": result.get("code"), "name": info.get("name"), "deposits": info.get("deposits"),
+                 "confidence": result.get("confidence"), "fields": result.get("fields") or {}}
+        key = (event["code"], event["name"], event["deposits"], tuple(sorted(event["fields"].items())))
+        with self._cond:
+            if key == self._last_key:
+                return
+            self.seq += 1
+            event.update(seq=self.seq, ts=round(time.time(), 3))
+            self._events.append((self.seq, json.dumps(event, separators=(",", ":"))))
+            self._last_key = key
+            self._cond.notify_all()
+
+    def since(self, seq):
+        """Events after `seq`, or None if the client has to start over: some of them
+        already fell out of the history, or `seq` is from before a restart (ahead of ours)."""
+        with self._cond:
+            if seq > self.seq or (self._events and seq < self._events[0][0] - 1):
+                return None
+            return [e for e in self._events if e[0] > seq]
+
+    def latest(self):
+        with self._cond:
+            return self._events[-1] if self._events else None
+
+    def stream(self, last_id=None, keepalive=15.0):
+        """SSE text for one client; resumes after `last_id` if given."""
+        with self._cond:
+            self.clients += 1
+        try:
+            yield "retry: 2000\n\n"
+            latest = self.latest()
+            if last_id is None:  # new client: start with the current result
+                seq, pending = (latest[0] - 1, [latest]) if latest else (self.seq, [])
+            else:
+                seq, pending = last_id, self.since(last_id)
+            while True:
+                if pending is None:  # missed too much or stale id: start over from the current result
+                    latest = self.latest()
+                    if latest:
+                        yield f"id: {latest[0]}\nevent: reset\ndata: {latest[1]}\n\n"
+                    seq, pending = (latest[0] if latest else 0), []
+                for seq, data in pending:
+                    yield f"id: {seq}\nevent: result\ndata: {data}\n\n"
+                with self._cond:
+                    woke = self._cond.wait_for(lambda: self.seq > seq, keepalive)
+                if not woke:
+                    pending = []
+                    yield ": keepalive\n\n"
+                    continue
+                pending = self.since(seq)
+        finally:
+            with self._cond:
+                self.clients -= 1
+
+
+result_events = ResultEvents()
+
+
+# ---------- Scan History ----------
+class ScanHistory:
+    """Append-only scan history in SQLite (WAL), written by one background thread.
+
+    record() only puts a row on a bounded queue, so the scan path never waits
+    for the disk; a full queue drops the row and counts it. The writer inserts
+    in batches (one transaction per batch) and keeps hourly and daily rollups
+    per deposit and source up to date in the same transaction, so /history/stats
+    sums whole days from the daily rollup and only the partial days at the
+    edges from the hourly one, instead of reading every scan.
+    Readers use their own connection per thread; WAL lets them run while the
+    writer commits.
+    """
 
-@app.route("/")
+    ROLLUPS = (("scans_hourly", 3600), ("scans_daily", 86400))  # (table, seconds per bucket)
+
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS scans (
+               id INTEGER PRIMARY KEY, ts REAL NOT NULL, raw_text TEXT, code TEXT,
+               deposit_key TEXT, deposits INTEGER, confidence REAL, latency_ms REAL, source TEXT)""",
+        "CREATE INDEX IF NOT EXISTS scans_ts ON scans (ts)",
+        "CREATE INDEX IF NOT EXISTS scans_key_ts ON scans (deposit_key, ts)",
+        "CREATE INDEX IF NOT EXISTS scans_source_ts ON scans (source, ts)",
+    ) + tuple(
+        f"""CREATE TABLE IF NOT EXISTS {table} (
+               bucket INTEGER NOT NULL, deposit_key TEXT NOT NULL, source TEXT NOT NULL,
+               scans INTEGER NOT NULL, deposits INTEGER NOT NULL, latency_ms_sum REAL NOT NULL,
+               latency_count INTEGER NOT NULL, PRIMARY KEY (bucket, deposit_key, source)) WITHOUT ROWID"""
+        for table in ("scans_hourly", "scans_daily"))
+    COLUMNS = ("id", "ts", "raw_text", "code", "deposit_key", "deposits", "confidence", "latency_ms", "source")
+
+    def __init__(self, path, batch_size=200, flush_seconds=1.0, queue_size=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.counters = Counter()  # written / dropped / batches / errors
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._readers = local()
+        self._thread = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commit can be lost on power loss
+        return conn
+
+    def start(self):
+        conn = self._connect()
+        with conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+        conn.close()
+        self._thread = Thread(target=self._write_loop, name="scan-history", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, result, source, latency_ms=None):
+        """Queue a published result. Never blocks."""
+        info = result.get("info") or {}
+        row = (time.time(), result.get("raw_text"), result.get("code"), info.get("key"), info.get("deposits"),
+               result.get("confidence"), latency_ms, source)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.counters["dropped"] += 1
+
+    def close(self, timeout=5.0):
+        """Write what is still queued and stop the writer."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            row = self._queue.get()
+            batch, stop = [], row is None
+            if row is not None:
+                batch.append(row)
+            deadline = time.monotonic() + self.flush_seconds
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                else:
+                    batch.append(row)
+            if batch:
+                try:
+                    self._write(conn, batch)
+                except sqlite3.Error as e:
+                    self.counters["errors"] += 1
+                    logger.error(f"Scan history write failed ({len(batch)} rows lost): {e}")
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn, batch):
+        with conn:  # one transaction per batch
+            conn.executemany("INSERT INTO scans (ts, raw_text, code, deposit_key, deposits, confidence, latency_ms,"
+                             " source) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            for table, seconds in self.ROLLUPS:
+                sums = {}
+                for ts, _raw, _code, key, deposits, _conf, latency_ms, source in batch:
+                    agg = sums.setdefault((int(ts // seconds), key or "", source or ""), [0, 0, 0.0, 0])
+                    agg[0] += 1
+                    agg[1] += deposits or 0
+                    if latency_ms is not None:
+                        agg[2] += latency_ms
+                        agg[3] += 1
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (bucket, deposit_key, source)"
+                    " DO UPDATE SET scans = scans + excluded.scans, deposits = deposits + excluded.deposits,"
+                    " latency_ms_sum = latency_ms_sum + excluded.latency_ms_sum,"
+                    " latency_count = latency_count + excluded.latency_count",
+                    [k + tuple(v) for k, v in sums.items()])
+        self.counters["written"] += len(batch)
+        self.counters["batches"] += 1
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @staticmethod
+    def _where(since=None, until=None, key=None, source=None, ts_column="ts"):
+        clauses, params = [], []
+        for value, clause in ((since, f"{ts_column} >= ?"), (until, f"{ts_column} < ?"),
+                              (key, "deposit_key = ?"), (source, "source = ?")):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def page(self, since=None, until=None, key=None, source=None, before=None, limit=100):
+        """Newest rows first, keyset-paginated on (ts, id): pass the returned `next` as before.
+
+        Ordering by (ts, id) lets every filter walk its (…, ts) index backwards
+        instead of sorting the matches. Raises ValueError for a malformed cursor.
+        """
+        where, params = self._where(since, until, key, source)
+        if before is not None:
+            ts, _, row_id = str(before).partition(":")
+            where += (" AND" if where else " WHERE") + " (ts, id) < (?, ?)"
+            params += [float(ts), int(row_id)]
+        rows = self._reader().execute(f"SELECT {', '.join(self.COLUMNS)} FROM scans{where}"
+                                      " ORDER BY ts DESC, id DESC LIMIT ?", params + [limit]).fetchall()
+        items = [dict(zip(self.COLUMNS, row)) for row in rows]
+        last = items[-1] if len(items) == limit else None
+        return {"items": items, "next": f"{last['ts']!r}:{last['id']}" if last else None}
+
+    def aggregate(self, since=None, until=None, key=None, source=None):
+        """Scan and deposit totals per deposit key and per source.
+
+        since/until are applied on whole hours (the hour containing `since` counts).
+        """
+        h0 = 0 if since is None else int(since // 3600)
+        h1 = 2 ** 40 if until is None else int(-(-until // 3600))
+        d0, d1 = -(-h0 // 24), h1 // 24
+        if d0 < d1:  # whole days from the daily rollup, the hours around them from the hourly one
+            segments = [("scans_daily", 86400, d0, d1), ("scans_hourly", 3600, h0, d0 * 24),
+                        ("scans_hourly", 3600, d1 * 24, h1)]
+        else:
+            segments = [("scans_hourly", 3600, h0, h1)]
+        selects, params = [], []
+        for table, seconds, lo, hi in segments:
+            if lo >= hi:
+                continue
+            where, where_params = self._where(lo, hi, key, source, "bucket")
+            selects.append(f"SELECT deposit_key, source, scans, deposits, latency_ms_sum, latency_count,"
+                           f" bucket * {seconds} AS start, (bucket + 1) * {seconds} AS stop FROM {table}{where}")
+            params += where_params
+        rows = self._reader().execute(
+            "SELECT deposit_key, source, SUM(scans), SUM(deposits), SUM(latency_ms_sum), SUM(latency_count),"
+            f" MIN(start), MAX(stop) FROM ({' UNION ALL '.join(selects)}) GROUP BY deposit_key, source",
+            params).fetchall() if selects else []
+        by_key, by_source = {}, {}
+        for deposit_key, src, scans, deposits, latency_sum, latency_count, first, last in rows:
+            for groups, name in ((by_key, deposit_key or None), (by_source, src)):
+                g = groups.setdefault(name, {"scans": 0, "deposits": 0, "latency_ms_sum": 0.0, "latency_count": 0,
+                                             "first_ts": first, "last_ts": last})
+                g["scans"] += scans
+                g["deposits"] += deposits
+                g["latency_ms_sum"] += latency_sum
+                g["latency_count"] += latency_count
+                g["first_ts"], g["last_ts"] = min(g["first_ts"], first), max(g["last_ts"], last)
+
+        def finish(g):
+            latency_count = g.pop("latency_count")
+            g["avg_latency_ms"] = round(g.pop("latency_ms_sum") / latency_count, 1) if latency_count else None
+            return g
+
+        return {"total": sum(g["scans"] for g in by_source.values()),
+                "by_deposit": [dict(finish(g), deposit_key=k)
+                               for k, g in sorted(by_key.items(), key=lambda kv: -kv[1]["scans"])],
+                "by_source": {src: finish(g) for src, g in by_source.items()}}
+
+    def stats(self):
+        return dict(self.counters, queued=self._queue.qsize())
+
+
+scan_history = None
+
+
+def init_scan_history():
+    """Open the history database and start its writer (no-op when disabled)."""
+    global scan_history
+    if not HISTORY.get("enabled", True):
+        scan_history = None
+        return
+    scan_history = ScanHistory(HISTORY_FILE, batch_size=int(HISTORY["batch_size"]),
+                               flush_seconds=float(HISTORY["flush_seconds"]))
+    try:
+        scan_history.start()
+    except sqlite3.Error as e:
+        logger.warning(f"Scan history disabled, could not open {HISTORY_FILE}: {e}")
+        scan_history = None
+METRICS.gauge("event_clients", "Connected /events clients", lambda: result_events.clients)
+
+
+# ---------- Flask / Hotkeys ----------
 def index():
-    return render_template("overlay.html")
+    return flask.render_template("overlay.html")
 
 
+def status_body():
+    return {"region": CAP_REGION, "rois": ROIS, "label_color": label_color, "last": last_result,
+            "preflight": PREFLIGHT, "stats": SCAN_STATS, "capture": capture_engine.stats(),
+            "pipeline": scan_pipeline.stats(), "model": model_manager.stats(),
+            "ollama": ollama_endpoint.stats(), "overlay": overlay_updates.stats(),
+            "ocr_backend": ocr_backend.engines() if ocr_backend else None,
+            "ocr_cache": ocr_cache.stats() if ocr_cache else None,
+            "history": scan_history.stats() if scan_history else None,
+            "seq": result_events.seq}
+
 
-@app.route("/status")
 def status():
-    return jsonify({"region": CAP_REGION, "label_color": label_color, "last": last_result})
+    # The ETag is a hash of the serialised body, so any change in it (counters,
+    # scheduler interval, fields) gives a new tag; unchanged polls get a 304
+    # without the body being sent
+    body = json.dumps(status_body(), sort_keys=True, default=str)
+    etag = hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+    if etag in flask.request.if_none_match:
+        response = flask.Response(status=304)
+    else:
+        response = flask.Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
-def hotkey_listener():
-    """Set up hotkey listeners with cross-platform error handling."""
+def events():
+    """Server-Sent Events: one `result` event per newly published result."""
+    last_id = flask.request.headers.get("Last-Event-ID") or flask.request.args.get("last_event_id")
     try:
-        keyboard.add_hotkey("7", capture_once)
-        keyboard.add_hotkey("ctrl+7", toggle_continuous)
-        keyboard.add_hotkey("8", toggle_border)
-        logger.info("Hotkeys registered: '7' for single scan, 'Ctrl+7' for continuous toggle, '8' for border toggle")
-        keyboard.wait()
-    except Exception as e:
-        logger.warning(f"Could not set up global hotkeys: {e}")
-        logger.info("Note: Linux Support is being tested.")
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        last_id = None
+    return flask.Response(result_events.stream(last_id), mimetype="text/event-stream",
+                          headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
-# ---------- Main ----------
+def _history_filters():
+    args = flask.request.args
+    return {"since": args.get("since", type=float), "until": args.get("until", type=float),
+            "key": args.get("key") or None, "source": args.get("source") or None}
 
-    # Ensure Ollama + model before starting
-def continuous_scan_loop():
-    """Run scans repeatedly until continuous_mode is turned off."""
-    while continuous_mode:
-        capture_once()
-        time.sleep(2)  # adjust scan interval
 
+def history():
+    """Scan history, newest first. ?since=&until= (unix time), key=, source=, limit=;
+    ?before= takes the `next` cursor of the previous page."""
+    if not scan_history:
+        return flask.jsonify({"error": "scan history disabled"}), 404
+    limit = min(max(flask.request.args.get("limit", 100, type=int), 1), 1000)
+    try:
+        page = scan_history.page(before=flask.request.args.get("before"), limit=limit, **_history_filters())
+    except ValueError:
+        return flask.jsonify({"error": "invalid before cursor"}), 400
+    return flask.jsonify(page)
 
 
-# ---------- Flask / Hotkeys ----------
-template_folder = resource_path("templates")
-app = Flask(__name__, template_folder=template_folder)
+def history_stats():
+    """Scans and deposits per deposit key and per source over ?since=&until= (whole hours), key=, source=."""
+    if not scan_history:
+        return flask.jsonify({"error": "scan history disabled"}), 404
+    return flask.jsonify(scan_history.aggregate(**_history_filters()))
 
-@app.route("/")
-def index():
-    return render_template("overlay.html")
 
+def metrics():
+    """Prometheus text exposition; scan counters come straight from SCAN_STATS and the OCR cache."""
+    cache = ocr_cache.stats() if ocr_cache else {}
+    counters = [
+        ("scans_total", "Scans started", (), SCAN_STATS["scans"]),
+        ("scans_skipped_total", "Scans answered without OCR", (("reason", "unchanged"),), SCAN_STATS["skipped_unchanged"]),
+        ("scans_skipped_total", "Scans answered without OCR", (("reason", "cache"),), cache.get("hits", 0)),
+        ("scans_skipped_total", "Scans answered without OCR", (("reason", "local"),), SCAN_STATS["local_ocr_hits"]),
+        ("ocr_calls_total", "OCR backend calls", (), SCAN_STATS["ocr_calls"]),
+        ("ollama_retries_total", "Retried Ollama requests", (), ollama_endpoint.counters["retries"]),
+        ("model_loads_total", "Vision model loads", (), model_manager.metrics["loads"]),
+        ("model_unloads_total", "Vision model unloads", (), model_manager.metrics["unloads"]),
+    ]
+    return flask.Response(METRICS.render(counters), mimetype="text/plain; version=0.0.4")
 
 
-@app.route("/status")
-def status():
-    return jsonify({"region": CAP_REGION, "label_color": label_color, "last": last_result})
+def create_app():
+    """Flask app with all routes; built in the server thread so flask loads off the startup path."""
+    app = flask.Flask(__name__, template_folder=resource_path("templates"))
+    app.add_url_rule("/", view_func=index)
+    app.add_url_rule("/status", view_func=status)
+    app.add_url_rule("/metrics", view_func=metrics)
+    app.add_url_rule("/events", view_func=events)
+    app.add_url_rule("/history", view_func=history)
+    app.add_url_rule("/history/stats", view_func=history_stats)
+    return app
+
+
+def run_web_server():
+    create_app().run(host="127.0.0.1", port=5000, debug=False, threaded=True)  # one thread per /events client
 
 
 def hotkey_listener():
     """Set up hotkey listeners with cross-platform error handling."""
     try:
-        keyboard.add_hotkey("7", capture_once)
+        # '7' / 'Ctrl+7' mean a scan is coming: start reloading an unloaded model on key down
+        keyboard.on_press_key("7", lambda _event: model_manager.on_activity())
+        keyboard.add_hotkey("7", request_scan)
         keyboard.add_hotkey("ctrl+7", toggle_continuous)
         keyboard.add_hotkey("8", toggle_border)
         logger.info("Hotkeys registered: '7' for single scan, 'Ctrl+7' for continuous toggle, '8' for border toggle")
@@ -831,28 +3398,29 @@ def hotkey_listener():
         logger.info("Note: Linux Support is being tested.")
 
 
-# ---------- Main ----------
-
-    # Ensure Ollama + model before starting
+# ---------- Main GUI ----------
 def launch_gui():
 
     def on_close():
         save_config()
+        if ocr_cache:
+            ocr_cache.save()
+        if digit_recognizer:
+            digit_recognizer.save()
         try:
             if root_overlay:
                 root_overlay.destroy()
         except:
             pass
         root.destroy()
+        capture_engine.stop()
+
+    def scan_once():
+        request_scan("gui")
 
     def toggle_scanning():
-        global continuous_mode
-        continuous_mode = not continuous_mode
-        if continuous_mode:
-            btn_start_stop.config(text="Stop Scannen")
-            Thread(target=continuous_scan_loop, daemon=True).start()
-        else:
-            btn_start_stop.config(text="Start Scannen")
+        toggle_continuous()
+        btn_start_stop.config(text="Stop Scannen" if continuous_mode else "Start Scannen")
 
     root = tk.Tk()
     root.title("Star Citizen Scanner – ROI")
@@ -865,61 +3433,289 @@ def launch_gui():
     top.pack(fill="x", pady=(0,8))
     btn_start_stop = ttk.Button(top, text="Start Scannen", command=toggle_scanning)
     btn_start_stop.pack(side="left")
-    ttk.Button(top, text="Einmal scannen", command=capture_once).pack(side="left", padx=6)
+    ttk.Button(top, text="Einmal scannen", command=scan_once).pack(side="left", padx=6)
     ttk.Button(top, text="Label-Farbe", command=choose_label_color).pack(side="left", padx=6)
     ttk.Button(top, text="Overlay-Rand", command=toggle_border).pack(side="left", padx=6)
 
+    def roi_names():
+        return [r["name"] for r in ROIS]
+
+    def add_roi():
+        name = simpledialog.askstring("Neue Region", "Name der Region (z.B. mass, inst, res):", parent=root)
+        name = (name or "").strip()
+        if not name or name in roi_names():
+            return
+        editor.add_roi(name)
+        roi_choice.config(values=roi_names())
+
+    def remove_roi():
+        editor.remove_roi(roi_choice.get())
+        roi_choice.config(values=roi_names())
+
+    roi_bar = ttk.Frame(wrapper)
+    roi_bar.pack(fill="x", pady=(0,6))
+    ttk.Label(roi_bar, text="Bearbeitete Region:").pack(side="left")
+    roi_choice = ttk.Combobox(roi_bar, state="readonly", width=14, values=roi_names())
+    roi_choice.pack(side="left", padx=6)
+    roi_choice.bind("<<ComboboxSelected>>", lambda e: editor.select(roi_choice.get()))
+    ttk.Button(roi_bar, text="Region hinzufügen", command=add_roi).pack(side="left", padx=6)
+    ttk.Button(roi_bar, text="Region entfernen", command=remove_roi).pack(side="left", padx=6)
+
     card = ttk.LabelFrame(wrapper, text="Region 16:9 (GUI = 960×540 ≙ 1920×1080)")
     card.pack(fill="both", expand=True)
-    editor = ROIEditor(card)
+    editor = ROIEditor(card, on_select=roi_choice.set)
     editor.pack(anchor="center", pady=6)
 
     lbl_status = ttk.Label(wrapper, text="ROI-Editor: Drag zum Verschieben, Mausrad zum Zoomen (130:44).", anchor="w", justify="left")
     lbl_status.pack(fill="x", pady=(8,0))
 
-    show_overlay()
-    root.mainloop()
-
+    lbl_preflight = ttk.Label(wrapper, text="", anchor="w", justify="left")
+    lbl_preflight.pack(fill="x", pady=(4,0))
 
+    def refresh_preflight():
+        # Poll only until the background preflight has finished
+        lbl_preflight.config(text=f"KI-Modell: {PREFLIGHT['detail'] or 'wird geprüft...'}")
+        if PREFLIGHT["state"] not in ("ready", "error"):
+            root.after(500, refresh_preflight)
 
-def toggle_continuous():
-    """Toggle continuous scanning mode."""
-    global continuous_mode
-    continuous_mode = not continuous_mode
-    logger.info(f"Continuous mode: {continuous_mode}")
-    if continuous_mode:
-        Thread(target=continuous_scan_loop, daemon=True).start()
+    refresh_preflight()
 
+    show_overlay()
+    root.mainloop()
 
 
 
-def hotkey_listener():
-    """Set up hotkey listeners with cross-platform error handling."""
+# ---------- Offline Replay ----------
+# `scan_deposits.py replay <dir|video>` re-reads recorded sessions headless.
+# Decoding, cropping, preprocessing and the local reader run in a process pool;
+# OCR backend calls run on a thread pool capped at --ocr-concurrency, so the
+# model server is kept saturated but not flooded. Results stream out as JSONL
+# in frame order.
+REPLAY_IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+_replay = {}  # per-process replay settings, set by _replay_worker_init
+
+
+def replay_region(image_shape, region, screen):
+    """CAP_REGION (screen coordinates) -> (x, y, w, h) in a recorded image,
+    scaled when the recording's resolution differs from `screen` (w, h)."""
+    h, w = image_shape[:2]
+    sx, sy = w / screen[0], h / screen[1]
+    x = int(round((region["left"] - REGION_ANCHOR["left"]) * sx))
+    y = int(round((region["top"] - REGION_ANCHOR["top"]) * sy))
+    rw, rh = max(1, int(round(region["width"] * sx))), max(1, int(round(region["height"] * sy)))
+    if x < 0 or y < 0 or x + rw > w or y + rh > h:
+        raise ValueError(f"region {region} lies outside the {w}x{h} recording")
+    return x, y, rw, rh
+
+
+def crop_roi(image, region, screen):
+    x, y, w, h = replay_region(image.shape, region, screen)
+    roi = image[y:y + h, x:x + w]
+    if roi.ndim == 2:
+        return cv2.cvtColor(roi, cv2.COLOR_GRAY2BGRA)
+    return cv2.cvtColor(roi, cv2.COLOR_BGR2BGRA) if roi.shape[2] == 3 else roi.copy()
+
+
+def iter_replay_tasks(path, every=1, region=None, screen=None):
+    """(index, source, payload) per frame: payload is an image path (decoded in the
+    worker) or, for videos, the ROI already cut out here. VideoCapture is
+    sequential, so video frames are decoded in this process; only every n-th
+    frame is decoded (the rest are just grabbed) and only the ROI crosses to
+    the workers. A frame the region doesn't fit yields the error as payload."""
+    if os.path.isdir(path):
+        files = sorted(f for f in os.listdir(path) if f.lower().endswith(REPLAY_IMAGE_EXTS))
+        for index, name in enumerate(files[::every]):
+            yield index, name, os.path.join(path, name)
+    elif path.lower().endswith(REPLAY_IMAGE_EXTS):
+        yield 0, os.path.basename(path), path
+    else:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video {path}")
+        try:
+            frame_no = index = 0
+            while cap.grab():
+                if frame_no % every == 0:
+                    source = f"{os.path.basename(path)}@{cap.get(cv2.CAP_PROP_POS_MSEC):.0f}ms"
+                    ok, frame = cap.retrieve()
+                    try:
+                        payload = crop_roi(frame, region, screen) if ok else ValueError("undecodable frame")
+                    except ValueError as e:
+                        payload = e
+                    yield index, source, payload
+                    index += 1
+                frame_no += 1
+        finally:
+            cap.release()
+
+
+def _replay_worker_init(settings, log_queue):
+    forward_logging(log_queue)
+    _replay.update(settings)
+    PREPROCESS.update(settings["PREPROCESS"])
+    LOCAL_OCR.update(settings["LOCAL_OCR"])
+    init_digit_recognizer(autosave=False)
+
+
+def _replay_local(task):
+    """Worker side: decode + crop (image files) + preprocess + local reader for one frame."""
+    index, source, payload = task
+    result = {"index": index, "source": source}
     try:
-        keyboard.add_hotkey("7", capture_once)
-        keyboard.add_hotkey("ctrl+7", toggle_continuous)
-        keyboard.add_hotkey("8", toggle_border)
-        logger.info("Hotkeys registered: '7' for single scan, 'Ctrl+7' for continuous toggle, '8' for border toggle")
-        keyboard.wait()
+        if isinstance(payload, Exception):
+            raise payload
+        if isinstance(payload, str):
+            image = cv2.imread(payload, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError("unreadable image")
+            roi = crop_roi(image, _replay["region"], _replay["screen"])
+        else:
+            roi = payload  # video frame, cropped by iter_replay_tasks
+        gray = to_gray(roi)
+        result["fingerprint"] = frame_fingerprint(gray)
+        result["model_input"] = preprocess_roi(roi) if PREPROCESS["enabled"] else roi
+        code, confidence = digit_recognizer.recognize(gray) if digit_recognizer else (None, 0.0)
+        if code and confidence >= LOCAL_OCR["min_confidence"] and lookup_deposit(code):
+            result["local_code"] = code
     except Exception as e:
-        logger.warning(f"Could not set up global hotkeys: {e}")
-        logger.info("Note: Linux Support is being tested.")
+        result["error"] = str(e)
+    return result
 
 
-# ---------- Main ----------
+def _replay_record(local, raw_text, engine, ocr_ms=None):
+    code, raw = extract_code_from_text(raw_text)
+    info = lookup_deposit(code)
+    return {"index": local["index"], "source": local["source"], "code": code, "code_raw": raw,
+            "raw_text": raw_text, "engine": engine, "ocr_ms": ocr_ms,
+            "deposit": {k: info[k] for k in ("name", "key", "deposits", "probability")} if info else None}
+
+
+def _replay_ocr(local):
+    """Main-process thread: one OCR backend call for a frame the worker could not read."""
+    t0 = time.perf_counter()
+    answer = ocr_backend.read(local["model_input"], local_tried=True)  # the worker already ran the local reader
+    ocr_ms = round((time.perf_counter() - t0) * 1000, 1)
+    if ocr_cache and answer.text and OCR_BACKENDS[answer.backend].authoritative:
+        ocr_cache.put(local["fingerprint"], answer.text, extract_code_from_text(answer.text)[0])
+    return _replay_record(local, answer.text, answer.backend, ocr_ms)
+
+
+def _replay_resolve(local, ocr_pool):
+    """A future with the frame's JSONL record: answered locally/from cache, or queued for OCR."""
+    done = concurrent.futures.Future()
+    if "error" in local:
+        done.set_result({"index": local["index"], "source": local["source"], "error": local["error"]})
+    elif "local_code" in local:
+        done.set_result(_replay_record(local, local["local_code"], "local"))
+    elif ocr_cache and (cached := ocr_cache.get(local["fingerprint"])) is not None:
+        done.set_result(_replay_record(local, cached["raw_text"], "cache"))
+    else:
+        return ocr_pool.submit(_replay_ocr, local)
+    return done
 
-    # Ensure Ollama + model before starting
-# ---------- Main ----------
 
-    # Ensure Ollama + model before starting
+def run_replay(args):
+    load_config()
+    if args.backend:
+        OCR_BACKEND["name"] = args.backend
+    # one pooled connection per concurrent call
+    OLLAMA["max_connections"] = max(int(OLLAMA["max_connections"]), args.ocr_concurrency)
+    init_ocr_backend()
+    if args.no_cache:
+        OCR_CACHE["enabled"] = False
+    init_ocr_cache()
+    region = dict(zip(("left", "top", "width", "height"), args.region)) if args.region else CAP_REGION
+    settings = {"region": region, "screen": tuple(args.screen), "PREPROCESS": PREPROCESS, "LOCAL_OCR": LOCAL_OCR}
+    window = args.workers * 4  # frames in flight per stage; bounds memory on long videos
+
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    counts = Counter()
+    t0 = time.perf_counter()
+
+    def emit(future):
+        record = future.result()
+        counts[record.get("engine", "error")] += 1
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    # Workers forward their log records here; only this process writes the log
+    worker_logs = multiprocessing.Queue()
+    worker_listener = logging.handlers.QueueListener(
+        worker_logs, *(log_listener.handlers if log_listener else (logging.lastResort,)),
+        respect_handler_level=True)
+    worker_listener.start()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(args.workers, initializer=_replay_worker_init,
+                                                    initargs=(settings, worker_logs)) as pool, \
+                concurrent.futures.ThreadPoolExecutor(args.ocr_concurrency,
+                                                      thread_name_prefix="replay-ocr") as ocr_pool:
+            local_pending, out_pending = deque(), deque()
+
+            def advance():
+                out_pending.append(_replay_resolve(local_pending.popleft().result(), ocr_pool))
+                # Write finished records in frame order; block when too many are waiting on OCR
+                while out_pending and (out_pending[0].done() or len(out_pending) > window):
+                    emit(out_pending.popleft())
+
+            for task in iter_replay_tasks(args.path, args.every, region, settings["screen"]):
+                local_pending.append(pool.submit(_replay_local, task))
+                if len(local_pending) >= window:
+                    advance()
+            while local_pending:
+                advance()
+            while out_pending:
+                emit(out_pending.popleft())
+    finally:
+        worker_listener.stop()
+        if out is not sys.stdout:
+            out.close()
+        if ocr_cache:
+            ocr_cache.save()
+
+    elapsed = time.perf_counter() - t0
+    frames = sum(counts.values())
+    logger.info(f"Replay: {frames} frames in {elapsed:.1f} s ({frames / elapsed if elapsed else 0:.1f} frames/s), "
+                f"engines {dict(counts)}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Star Citizen deposit scanner (no command = GUI)")
+    sub = parser.add_subparsers(dest="command")
+    replay = sub.add_parser("replay", help="re-read recorded screenshots or a video headless, JSONL out")
+    replay.add_argument("path", help="directory of screenshots, a single image or a video file")
+    replay.add_argument("--out", default="-", help="JSONL output file (default stdout)")
+    replay.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="processes for decoding, cropping and the local reader")
+    replay.add_argument("--ocr-concurrency", type=int, default=2, help="OCR backend calls in flight")
+    replay.add_argument("--every", type=int, default=1, help="use every n-th frame/file")
+    replay.add_argument("--backend", choices=sorted(OCR_BACKENDS), help="override OCR_BACKEND from config.json")
+    replay.add_argument("--region", type=int, nargs=4, metavar=("LEFT", "TOP", "WIDTH", "HEIGHT"),
+                        help="ROI in screen coordinates (default CAP_REGION)")
+    replay.add_argument("--screen", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"), default=(1920, 1080),
+                        help="screen resolution the region refers to; recordings are scaled to it")
+    replay.add_argument("--no-cache", action="store_true", help="ignore the OCR answer cache (re-score everything)")
+    return parser.parse_args(argv)
+
 
 # ---------- Main ----------
 if __name__ == "__main__":
-    # Ensure Ollama + model before starting
-    ensure_ollama_installed()
-    ensure_model_installed("qwen2.5vl:3b")
+    setup_logging()
+    args = parse_args()
+    if args.command == "replay":
+        sys.exit(run_replay(args))
 
     load_config()
+    init_ocr_backend()
+    init_scan_history()
+    # Installing Ollama is interactive and ends the program; everything else
+    # (version check, model pull, heavy imports) runs in the background preflight.
+    if ocr_uses_ollama() and ollama_endpoint.is_local() and not shutil.which("ollama"):
+        ensure_ollama_installed()
+
+    capture_engine.configure(CAPTURE["fps"], CAPTURE["buffer_size"])
+    init_base_region(1)  # reads the monitor layout; the preflight starts the capture engine
+    Thread(target=run_preflight, name="preflight", daemon=True).start()
     Thread(target=hotkey_listener, daemon=True).start()
-    Thread(target=lambda: app.run(host="127.0.0.1", port=5000, debug=False), daemon=True).start()
+    Thread(target=run_web_server, daemon=True).start()
     launch_gui()
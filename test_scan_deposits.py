@@ -0,0 +1,388 @@
+"""Unit tests for scan_deposits behaviour that needs no GUI, camera or Ollama."""
+
+import asyncio
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+import scan_deposits as sd
+
+
+def render_code(text, noise_seed=0, width=160, height=54):
+    """BGRA ROI with `text` on a noisy dark background, like the in-game readout."""
+    rng = np.random.default_rng(noise_seed)
+    frame = np.full((height, width, 4), 255, np.uint8)
+    frame[..., :3] = np.clip(rng.normal(25, 4, (height, width, 3)), 0, 255).astype(np.uint8)
+    cv2.putText(frame, text, (8, height * 2 // 3), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (235, 235, 200, 255), 2,
+                cv2.LINE_AA)
+    return frame
+
+
+# ---------- Change detection ----------
+@pytest.mark.parametrize("before, after", [("18000", "16000"), ("18000", "12000"),
+                                           ("9600", "9800"), ("1700", "1750")])
+def test_one_digit_change_passes_gate(before, after):
+    reference = sd.frame_signature(render_code(before, noise_seed=1))
+    assert sd.frame_changed(sd.frame_signature(render_code(after, noise_seed=2)), reference)
+
+
+def test_capture_noise_does_not_pass_gate():
+    reference = sd.frame_signature(render_code("18000", noise_seed=1))
+    assert not sd.frame_changed(sd.frame_signature(render_code("18000", noise_seed=2)), reference)
+
+
+# ---------- Scan history ----------
+@pytest.fixture
+def history(tmp_path):
+    store = sd.ScanHistory(str(tmp_path / "history.db"))
+    store.start()
+    store.close()  # tests write batches directly
+    conn = store._connect()
+    rows = [(1000.0 + i, str(i), str(i), "ATACAMITE" if i % 3 else "GRANITE", 10, 1.0, 100.0,
+             "gui" if i % 2 else "continuous") for i in range(250)]
+    store._write(conn, rows[:200])
+    store._write(conn, rows[200:])
+    conn.close()
+    return store
+
+
+def test_history_pages_cover_every_row_once(history):
+    seen, cursor = [], None
+    while True:
+        page = history.page(key="ATACAMITE", before=cursor, limit=40)
+        seen += [row["ts"] for row in page["items"]]
+        cursor = page["next"]
+        if cursor is None:
+            break
+    expected = sorted((1000.0 + i for i in range(250) if i % 3), reverse=True)
+    assert seen == expected
+
+
+def test_history_until_filter_and_bad_cursor(history):
+    page = history.page(until=1100.0, source="gui", limit=5)
+    assert [row["ts"] for row in page["items"]] == [1099.0, 1097.0, 1095.0, 1093.0, 1091.0]
+    with pytest.raises(ValueError):
+        history.page(before="not-a-cursor")
+
+
+@pytest.mark.parametrize("filters", [{"key": "GRANITE"}, {"until": 1100.0}, {"source": "gui"},
+                                     {"key": "GRANITE", "until": 1100.0}])
+def test_history_page_queries_use_an_index_order(history, filters):
+    where, params = history._where(filters.get("since"), filters.get("until"), filters.get("key"),
+                                   filters.get("source"))
+    plan = history._reader().execute(f"EXPLAIN QUERY PLAN SELECT * FROM scans{where} ORDER BY ts DESC, id DESC LIMIT 10",
+                                     params).fetchall()
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+
+def test_history_aggregate_sums_rollups(history):
+    stats = history.aggregate()
+    assert stats["total"] == 250
+    assert {row["deposit_key"]: row["scans"] for row in stats["by_deposit"]} == {"ATACAMITE": 166, "GRANITE": 84}
+    assert stats["by_source"]["gui"]["scans"] == 125
+
+
+# ---------- Result events / status ----------
+def publish(events, code):
+    events.publish({"code": code, "info": {"name": "Atacamite", "deposits": 10}, "confidence": 1.0, "fields": {}})
+
+
+def test_events_resume_after_last_event_id():
+    events = sd.ResultEvents()
+    for code in ("1", "2", "3"):
+        publish(events, code)
+    stream = events.stream(last_id=1, keepalive=0.01)
+    assert next(stream).startswith("retry:")
+    assert next(stream).startswith("id: 2\nevent: result")
+    assert next(stream).startswith("id: 3\nevent: result")
+
+
+def test_events_stale_id_from_before_restart_resets():
+    events = sd.ResultEvents()
+    for code in ("1", "2", "3"):
+        publish(events, code)
+    stream = events.stream(last_id=50, keepalive=0.01)
+    next(stream)
+    assert next(stream).startswith("id: 3\nevent: reset")
+    publish(events, "4")
+    assert next(stream).startswith("id: 4\nevent: result")
+
+
+def test_status_etag_follows_every_body_change(monkeypatch):
+    client = sd.create_app().test_client()
+    first = client.get("/status")
+    assert first.status_code == 200
+    assert client.get("/status", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    monkeypatch.setitem(sd.SCAN_STATS, "scans", sd.SCAN_STATS["scans"] + 1)
+    changed = client.get("/status", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json["stats"]["scans"] == first.json["stats"]["scans"] + 1
+
+
+# ---------- Deposit lookup ----------
+def test_lookup_ranks_ambiguous_codes_by_probability():
+    for code, best in sd.CODE_INDEX.items():
+        if best["ambiguous"]:
+            probabilities = [best["probability"]] + [alt["probability"] for alt in best["alternatives"]]
+            assert probabilities == sorted(probabilities, reverse=True)
+            assert sd.lookup_deposit(str(code)) is best
+
+
+@pytest.mark.parametrize("code, name, deposits", [("20400", "C-Type", 12), ("47500", "E-Type", 25)])
+def test_lookup_beyond_observed_counts_falls_back_to_multiples(code, name, deposits):
+    info = sd.lookup_deposit(code)
+    assert (info["name"], info["deposits"], info["extrapolated"]) == (name, deposits, True)
+
+
+@pytest.mark.parametrize("code", ["", "12500", "123", "0", "abc", "62000000", "170000", "52700"])
+def test_lookup_rejects_codes_no_deposit_produces(code):
+    assert sd.lookup_deposit(code) is None
+
+
+# ---------- OCR backends ----------
+class FakeRecognizer:
+    def __init__(self):
+        self.calls = []
+
+    def recognize(self, gray):
+        self.calls.append(gray)
+        return "18000", 1.0
+
+
+def test_cascade_skips_unknown_stages():
+    backend = sd.CascadeBackend(dict(sd.OCR_BACKEND, cascade=["nope", "mock"], mock_answers=["9600"]))
+    assert backend.engines() == ["mock"]
+    assert backend.read(np.zeros((4, 4), np.uint8)).text == "9600"
+
+
+def test_opencv_reads_raw_gray_and_not_twice(monkeypatch):
+    recognizer = FakeRecognizer()
+    monkeypatch.setattr(sd, "digit_recognizer", recognizer)
+    gray, model_input = np.zeros((30, 160), np.uint8), np.ones((32, 90), np.uint8)
+    backend = sd.CascadeBackend(dict(sd.OCR_BACKEND, cascade=["opencv", "mock"], mock_answers=["9600"]))
+    assert backend.read(model_input, gray).text == "18000"
+    assert recognizer.calls == [gray]
+    assert backend.read(model_input, gray, local_tried=True).text == "9600"
+    assert len(recognizer.calls) == 1
+
+
+# ---------- Overlay updates ----------
+class FakeTk:
+    """Records after() timers and which threads drew on the widget."""
+
+    def __init__(self):
+        self.timers, self.threads, self.texts = {}, set(), []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def after(self, ms, fn):
+        with self._lock:
+            self._next += 1
+            self.timers[self._next] = (ms, fn)
+            return self._next
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def itemconfig(self, item, **kwargs):
+        self.threads.add(threading.current_thread())
+        self.texts.append(kwargs.get("text"))
+
+    def drains(self):
+        return [timer for timer, (ms, _) in self.timers.items() if ms != sd.LABEL_TIMEOUT_MS]
+
+    def run_drain(self):
+        ms, fn = self.timers.pop(self.drains()[0])
+        fn()
+        return ms
+
+
+def test_overlay_updates_draw_on_the_main_thread_and_only_when_posted(monkeypatch):
+    tk_widget = FakeTk()
+    updates = sd.OverlayUpdates()
+    monkeypatch.setattr(sd, "overlay_updates", updates)
+    monkeypatch.setattr(sd, "overlay_canvas", tk_widget)
+    monkeypatch.setattr(sd, "overlay_text_id", 1)
+    sd.update_overlay_label({"name": "Atacamite", "deposits": 10})  # before the overlay exists
+    updates.attach(tk_widget)
+    assert tk_widget.texts == ["Atacamite x10"]
+    assert tk_widget.drains() == []  # nothing polls while the mailbox is empty
+
+    workers = [threading.Thread(target=sd.update_overlay_label, args=({"name": f"R{i}", "deposits": i},))
+               for i in range(20)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(tk_widget.drains()) == 1  # the burst arms a single drain
+    assert tk_widget.run_drain() == sd.FRAME_MS
+    assert tk_widget.threads == {threading.main_thread()}
+    assert len(tk_widget.texts) == 2  # the burst is drawn once
+    assert tk_widget.drains() == []
+    assert updates.stats() == {"posted": 21, "drawn": 2}
+
+
+# ---------- Replay ----------
+def test_replay_video_frames_are_cropped_before_the_workers(tmp_path):
+    path = str(tmp_path / "session.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (640, 360))
+    for i in range(6):
+        writer.write(np.full((360, 640, 3), i * 40, np.uint8))
+    writer.release()
+    region = {"left": 100, "top": 50, "width": 160, "height": 54}
+    tasks = list(sd.iter_replay_tasks(path, every=2, region=region, screen=(640, 360)))
+    assert [index for index, _, _ in tasks] == [0, 1, 2]
+    assert all(roi.shape == (54, 160, 4) for _, _, roi in tasks)
+
+    outside = dict(region, left=600)
+    _, _, payload = next(sd.iter_replay_tasks(path, region=outside, screen=(640, 360)))
+    assert isinstance(payload, ValueError)
+    assert "error" in sd._replay_local((0, "x", payload))
+
+
+# ---------- Published results ----------
+def test_field_updates_replace_last_result_instead_of_mutating(monkeypatch):
+    monkeypatch.setattr(sd, "last_result", dict(sd.last_result, fields={"mass": "1"}))
+    logged = sd.last_result
+    sd.publish_fields({"mass": "2"})
+    assert logged["fields"] == {"mass": "1"}
+    assert sd.last_result["fields"] == {"mass": "2"}
+
+
+def test_scheduler_rescans_a_confirmed_roi_within_two_seconds():
+    scheduler = sd.AdaptiveScheduler()
+    scheduler.on_confirmed()
+    for _ in range(10):
+        scheduler.on_idle()
+    assert scheduler.next_interval() <= 2.0
+    scheduler.on_change()
+    assert scheduler.next_interval() == sd.SCHEDULER["min_interval"]
+
+
+def test_stabilizer_confirms_agreeing_reads_and_resets(monkeypatch):
+    stabilizer = sd.ResultStabilizer()
+    read = sd.ScanRead("9600", "9.600", "9.600")
+    assert stabilizer.add(read)[0] is None and not stabilizer.settled()
+    assert stabilizer.add(sd.ScanRead("9600", "9600", "9600"))[0] is None
+    confirmed, confidence = stabilizer.add(sd.ScanRead("9600", "9,600", "9,600"))
+    assert confirmed.code == "9600" and confidence == 1.0 and stabilizer.settled()
+    monkeypatch.setattr(sd, "result_stabilizer", stabilizer)
+    monkeypatch.setattr(sd.scan_pipeline, "set_enabled", lambda enabled: None)
+    monkeypatch.setattr(sd.model_manager, "pin", lambda: None)
+    monkeypatch.setattr(sd.model_manager, "unpin", lambda: None)
+    monkeypatch.setattr(sd, "continuous_mode", False)
+    sd.toggle_continuous()
+    assert stabilizer.confirmed is None and stabilizer.settled()
+    assert stabilizer.add(read)[0] is None
+
+
+def test_unchanged_frames_do_not_vote(monkeypatch):
+    stabilizer = sd.ResultStabilizer()
+    monkeypatch.setattr(sd, "result_stabilizer", stabilizer)
+    monkeypatch.setattr(sd, "publish_read", lambda *args, **kwargs: None)
+    pipeline = sd.ScanPipeline()
+    frame = render_code("9600", noise_seed=1)
+    captured = sd.CapturedFrame(0.0, (), frame, 1.0, {"code": frame})
+
+    def read_once():
+        job = pipeline._gate(captured)
+        if job is None:
+            return None
+        pipeline._reference = job.signature
+        job.raw_text = "9600"
+        return sd.publish_scan(job, "continuous", require_consensus=True), job.use_cache
+
+    assert read_once() == (False, True)
+    # The same pixels are read again (without the cache) until enough reads agree
+    assert read_once() == (False, False)
+    assert stabilizer.confirmed is None
+    assert read_once() == (True, False)
+    assert stabilizer.confirmed.code == "9600"
+    reads = len(stabilizer._reads)
+    assert read_once() is None and len(stabilizer._reads) == reads  # settled: the gate skips, no vote
+
+
+def test_ocr_cache_autosaves_in_the_background(tmp_path):
+    path = str(tmp_path / "ocr_cache.json")
+    cache = sd.OCRResultCache(path, namespace="test")
+    cache.start_autosave(0.05)
+    cache.put("abc", "18000", "18000")
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+    cache.close()
+    reloaded = sd.OCRResultCache(path, namespace="test")
+    reloaded.load()
+    assert reloaded.get("abc")["raw_text"] == "18000"
+
+
+
+def test_learned_glyphs_autosave_in_the_background(tmp_path):
+    path = str(tmp_path / "digit_glyphs.npz")
+    recognizer = sd.DigitRecognizer(path)
+    recognizer.start_autosave(0.05, "glyphs-save")
+    assert recognizer.learn(sd.to_gray(render_code("18000")), "18000")
+    for _ in range(100):
+        if os.path.exists(path):
+            break
+        time.sleep(0.01)
+    recognizer.close()
+    reloaded = sd.DigitRecognizer(path)
+    reloaded.load()
+    assert set(reloaded.known_digits()) == set("180")
+    with open(path, "r+b") as f:  # what a kill in the middle of an in-place write left behind
+        f.truncate(10)
+    broken = sd.DigitRecognizer(path)
+    broken.load()
+    assert broken.known_digits() == ""
+
+
+def test_single_scan_requests_coalesce_while_one_is_in_flight(monkeypatch):
+    release, calls = threading.Event(), []
+
+    def fake_capture(source):
+        calls.append(source)
+        release.wait(2.0)
+
+    monkeypatch.setattr(sd, "capture_once", fake_capture)
+    pipeline = sd.ScanPipeline()
+    futures = [pipeline.request_scan() for _ in range(20)]
+    assert pipeline.scan_in_flight()
+    release.set()
+    futures[0].result(2.0)
+    assert len({id(f) for f in futures}) == 1 and calls == ["hotkey"]
+    assert pipeline.requests == {"started": 1, "coalesced": 19}
+    pipeline.request_scan("gui").result(2.0)
+    assert calls == ["hotkey", "gui"] and pipeline.requests["started"] == 2
+
+
+def test_field_batches_wait_for_the_model_lock(monkeypatch):
+    calls = []
+
+    class FakeBackend:
+        async def read_async(self, frame, gray=None, local_tried=False):
+            calls.append(frame.shape)
+            return sd.OCRAnswer("12.5", "ollama")
+
+    monkeypatch.setattr(sd, "ocr_backend", FakeBackend())
+    monkeypatch.setattr(sd, "ocr_cache", None)
+    monkeypatch.setattr(sd, "publish_fields", lambda fields: None)
+    reader = sd.FieldReader()
+    frame = render_code("12.5")
+    captured = sd.CapturedFrame(0.0, (), frame, 1.0, {"code": frame, "mass": frame})
+
+    async def run():
+        lock = asyncio.Lock()
+        async with lock:  # the code read is in progress
+            task = asyncio.create_task(reader.read_async(captured, lock))
+            await asyncio.sleep(0.05)
+            assert calls == []
+        await task
+
+    asyncio.run(run())
+    assert len(calls) == 1 and reader.snapshot() == {"mass": "12.5"}